@@ -3,26 +3,48 @@
 # user authentication, authorization, and routing requests to the Communicator.
 from dotenv import load_dotenv
 load_dotenv()
+import click
+import time
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity, create_refresh_token
 
 from flask_cors import CORS # Import CORS
 
 from database.crud import DatabaseManager
+from database.models import Base
 from services.file_storage_service import FilebaseManager
+from services.storage_backends import build_storage_backend
 from services.scraper_service import ScraperService
+from services.browser_pool import get_shared_browser_pool
+from services.fetch_cache import PolicyFetchCache
+from services.summary_cache import SummaryCache, MemoryTier, DiskTier
 from services.communicator import Communicator
+from services.file_reader_service import FileReaderService
+from services.summarizer_client import SummarizerClient
+from services.segment_cache import SegmentCache
+from services.similarity_index import SimilarityIndex
+from services.metrics import MetricsRegistry
+from services.job_queue import JobQueue
+from services.single_flight import SingleFlight
+from services.domain_throttle import DomainThrottle
+from services.recrawl_scheduler import RecrawlScheduler
 
 # Import blueprints for routes
 from routes.auth_routes import auth_bp
 from routes.policy_routes import policy_bp
 from routes.auth_routes import set_auth_db_manager # Import setter function
-from routes.policy_routes import set_policy_communicator, set_policy_managers # Import setter function for communicator and managers
+from routes.policy_routes import set_policy_communicator, set_policy_managers, set_policy_job_queue # Import setter function for communicator and managers
+from utils.structured_logging import (configure_logging, parse_mapping, new_request_id, valid_request_id,
+                                      set_request_id, get_request_id, logging_stats)
 # Import configuration
 from config import Config
 
+# Structured logging is set up before any component is built, so their startup messages are captured
+configure_logging(level=Config.LOG_LEVEL, fmt=Config.LOG_FORMAT, module_levels=parse_mapping(Config.LOG_MODULE_LEVELS),
+                  sample_rates=parse_mapping(Config.LOG_SAMPLE_RATES, float), queue_size=Config.LOG_QUEUE_SIZE)
+
 app = Flask(__name__)
 
 # Initialize Flask-JWT-Extended
@@ -40,21 +62,111 @@ CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}}) # <--- ADD TH
 app.config.from_object(Config)
 
 # Initialize database
-db = SQLAlchemy(app) # Initialize SQLAlchemy with your app
+# Flask-SQLAlchemy shares our models' metadata (for migrations) and its engine with DatabaseManager
+db = SQLAlchemy(app, metadata=Base.metadata) # Initialize SQLAlchemy with your app
 
 # Initialize Flask-Migrate with your app and db object
 migrate = Migrate(app, db) # <--- THIS LINE IS CRUCIAL FOR 'db' COMMAND
 
 # Initialize database, filebase, and communicator managers
-db_manager = DatabaseManager(Config.DATABASE_URL)
-filebase_manager = FilebaseManager(Config.AWS_ACCESS_KEY_ID, Config.AWS_SECRET_ACCESS_KEY, Config.S3_BUCKET_NAME, Config.AWS_REGION)
-communicator = Communicator(db_manager, filebase_manager)
+def build_communicator(engine=None):
+    """
+    Wires the database, filebase, scraper and cache managers into a Communicator.
+    Also used by process-pool job workers to build their own instance (with their own engine).
+    :param engine: SQLAlchemy engine to share; a new pooled engine is created when omitted.
+    """
+    db_manager = DatabaseManager(Config.DATABASE_URL, engine=engine)
+    metrics = MetricsRegistry()
+    metrics.instrument_engine(db_manager.engine)
+    summary_cache = None
+    if Config.SUMMARY_CACHE_ENABLED:
+        disk_tier = None
+        if Config.SUMMARY_DISK_CACHE_DIR:
+            disk_tier = DiskTier(Config.SUMMARY_DISK_CACHE_DIR, max_bytes=Config.SUMMARY_DISK_CACHE_MAX_BYTES,
+                                 ttl=Config.SUMMARY_DISK_CACHE_TTL)
+        summary_cache = SummaryCache(MemoryTier(max_entries=Config.SUMMARY_CACHE_MAX_ENTRIES,
+                                                max_bytes=Config.SUMMARY_CACHE_MAX_BYTES,
+                                                ttl=Config.SUMMARY_CACHE_TTL), disk_tier)
+    storage_backend = build_storage_backend(Config.STORAGE_BACKEND, Config.AWS_ACCESS_KEY_ID, Config.AWS_SECRET_ACCESS_KEY,
+                                            Config.S3_BUCKET_NAME, Config.AWS_REGION, local_root=Config.LOCAL_STORAGE_DIR,
+                                            max_pool_connections=Config.STORAGE_MAX_CONCURRENCY)
+    filebase_manager = FilebaseManager(Config.AWS_ACCESS_KEY_ID, Config.AWS_SECRET_ACCESS_KEY, Config.S3_BUCKET_NAME, Config.AWS_REGION,
+                                       summary_cache=summary_cache, storage_backend=storage_backend,
+                                       max_concurrency=Config.STORAGE_MAX_CONCURRENCY,
+                                       compress=Config.SUMMARY_COMPRESSION == "gzip",
+                                       compresslevel=Config.SUMMARY_COMPRESSION_LEVEL)
+    browser_pool = None
+    if Config.BROWSER_POOL_ENABLED:
+        # Drivers are launched lazily, one per concurrent scrape up to the pool size, then reused for the life of the worker
+        browser_pool = get_shared_browser_pool(Config.BROWSER_POOL_SIZE, Config.BROWSER_POOL_ACQUIRE_TIMEOUT,
+                                               Config.BROWSER_MAX_USES, Config.BROWSER_PAGE_LOAD_TIMEOUT)
+    scraper_service = ScraperService(browser_pool, http_timeout=Config.HTTP_FETCH_TIMEOUT,
+                                     http_pool_size=Config.HTTP_POOL_SIZE,
+                                     min_static_text_chars=Config.HTTP_MIN_STATIC_TEXT_CHARS,
+                                     domain_throttle=DomainThrottle(Config.SCRAPER_PER_DOMAIN_CONCURRENCY,
+                                                                    Config.SCRAPER_PER_DOMAIN_INTERVAL))
+    # Lease rows in the database extend request coalescing across gunicorn workers
+    single_flight = SingleFlight(db_manager, lease_ttl=Config.SINGLE_FLIGHT_LEASE_TTL,
+                                 poll_interval=Config.SINGLE_FLIGHT_POLL_INTERVAL)
+    file_reader = FileReaderService(max_bytes=Config.FILE_MAX_BYTES, max_pages=Config.FILE_MAX_PAGES,
+                                    time_limit=Config.FILE_EXTRACT_TIME_LIMIT,
+                                    parallel_min_pages=Config.FILE_PARALLEL_MIN_PAGES,
+                                    max_workers=Config.FILE_EXTRACT_WORKERS)
+    summarizer_client = None
+    if not Config.SUMMARIZER_MOCK:
+        summarizer_client = SummarizerClient(Config.SUMMARIZER_AI_ENDPOINT, token_budget=Config.SUMMARIZER_TOKEN_BUDGET,
+                                             batch_size=Config.SUMMARIZER_BATCH_SIZE,
+                                             max_concurrency=Config.SUMMARIZER_MAX_CONCURRENCY,
+                                             connect_timeout=Config.SUMMARIZER_CONNECT_TIMEOUT,
+                                             read_timeout=Config.SUMMARIZER_READ_TIMEOUT,
+                                             retries=Config.SUMMARIZER_RETRIES)
+    segment_cache = None
+    if Config.SEGMENT_CACHE_ENABLED:
+        segment_cache = SegmentCache(Config.SEGMENT_CACHE_PATH, max_entries=Config.SEGMENT_CACHE_MAX_ENTRIES,
+                                     namespace=Config.SEGMENT_CACHE_NAMESPACE)
+    similarity_index = None
+    if Config.SIMILARITY_INDEX_ENABLED:
+        similarity_index = SimilarityIndex(db_manager, num_perm=Config.SIMILARITY_NUM_PERM, bands=Config.SIMILARITY_BANDS,
+                                           threshold=Config.SIMILARITY_THRESHOLD)
+    communicator = Communicator(db_manager, filebase_manager, scraper_service, file_reader=file_reader,
+                                summarizer_client=summarizer_client, segment_cache=segment_cache,
+                                similarity_index=similarity_index,
+                                near_duplicate_reuse_threshold=Config.NEAR_DUPLICATE_REUSE_THRESHOLD, metrics=metrics,
+                                single_flight=single_flight,
+                                import_max_workers=Config.IMPORT_MAX_WORKERS, import_max_links=Config.IMPORT_MAX_LINKS,
+                                # With the scheduler on, library refreshes reuse fetches it made within one min-age window
+                                refresh_max_staleness=Config.RECRAWL_MIN_AGE if Config.RECRAWL_ENABLED else 0)
+    if Config.FETCH_CACHE_ENABLED:
+        communicator.fetch_cache = PolicyFetchCache(db_manager, scraper_service, communicator._calculate_hash,
+                                                    fresh_ttl=Config.FETCH_CACHE_FRESH_TTL, max_age=Config.FETCH_CACHE_MAX_AGE,
+                                                    max_entries=Config.FETCH_CACHE_MAX_ENTRIES,
+                                                    max_bytes=Config.FETCH_CACHE_MAX_BYTES)
+    return communicator
+
+with app.app_context():
+    communicator = build_communicator(engine=db.engine)
+db_manager = communicator.db_manager
+filebase_manager = communicator.fb_manager
+scraper_service = communicator.scraper_service
+# Background summarization jobs (see services/job_queue.py)
+job_queue = JobQueue(communicator, executor_type=Config.JOB_EXECUTOR, max_workers=Config.JOB_MAX_WORKERS,
+                     communicator_factory=build_communicator)
+
+# Background re-crawl of linked policies (see services/recrawl_scheduler.py)
+recrawl_scheduler = None
+if Config.RECRAWL_ENABLED:
+    recrawl_scheduler = RecrawlScheduler(communicator, interval=Config.RECRAWL_INTERVAL, min_age=Config.RECRAWL_MIN_AGE,
+                                         global_rate_per_minute=Config.RECRAWL_GLOBAL_RATE,
+                                         domain_rate_per_minute=Config.RECRAWL_DOMAIN_RATE,
+                                         max_workers=Config.RECRAWL_MAX_WORKERS)
+    recrawl_scheduler.start()
 
 # Pass initialized managers/communicator to routes via setter functions
 # This avoids circular imports if routes directly import managers
 set_auth_db_manager(db_manager)
 set_policy_communicator(communicator)
 set_policy_managers(db_manager, filebase_manager)
+set_policy_job_queue(job_queue)
 
 # Register blueprints
 app.register_blueprint(auth_bp)
@@ -69,6 +181,111 @@ def health_check():
     """Basic health check endpoint."""
     return jsonify({"status": "ok", "message": "SafeAgree Backend is running!"}), 200
 
+@app.before_request
+def assign_request_id():
+    """Tags the request's log records with its X-Request-ID (a new id if the client sent none)."""
+    set_request_id(valid_request_id(request.headers.get("X-Request-ID")) or new_request_id())
+
+@app.before_request
+def begin_db_session_scope():
+    """Lets all CRUD calls of one request share a single session and connection."""
+    db_manager.begin_session_scope()
+    db_manager.query_counter.start()
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def add_query_count_header(response):
+    """Reports the number of SQL statements the request ran, so query regressions are visible."""
+    count = db_manager.query_counter.count
+    if count is not None:
+        response.headers["X-Query-Count"] = str(count)
+    request_id = get_request_id()
+    if request_id is not None:
+        response.headers["X-Request-ID"] = request_id
+    started = g.get("request_started")
+    if started is not None:
+        # Route template, not the raw path, keeps label cardinality bounded
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        communicator.metrics.observe("http_request_duration_seconds", (request.method, route, str(response.status_code)),
+                                     time.perf_counter() - started)
+        if count is not None:
+            communicator.metrics.observe("http_request_queries", (route,), count)
+    return response
+
+@app.teardown_request
+def end_db_session_scope(exception=None):
+    db_manager.end_session_scope(exception)
+    db_manager.query_counter.stop()
+    set_request_id(None) # Worker threads are reused across requests
+
+@app.errorhandler(413)
+def request_too_large(error):
+    """Rejects oversized request bodies (see Config.MAX_CONTENT_LENGTH) with a JSON message."""
+    return jsonify({"message": f"Request body too large. Uploads are limited to {Config.UPLOAD_MAX_BYTES} bytes."}), 413
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Stage, SQL and HTTP latency histograms of this worker process in Prometheus text format."""
+    return communicator.metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+@app.route("/stats/logging")
+def logging_pipeline_stats():
+    """Log queue depth and records dropped because the queue was full (this worker process)."""
+    return jsonify(logging_stats()), 200
+
+
+@app.route("/stats/db-pool")
+def db_pool_stats():
+    """Reports connection pool usage (checked out, overflow, checkout wait times) for this worker."""
+    return jsonify(db_manager.get_pool_metrics()), 200
+
+@app.route("/stats/scraper")
+def scraper_stats():
+    """Reports which fetch tier (plain HTTP or browser) served scraped URLs in this worker, and browser pool usage."""
+    stats = scraper_service.tier_stats()
+    pool = scraper_service.browser_pool
+    stats["browser_pool"] = pool.stats() if pool is not None else None
+    return jsonify(stats), 200
+
+
+@app.route("/stats/segment-cache")
+def segment_cache_stats():
+    """Reports how many segment summaries this worker reused, overall and per recent policy."""
+    if communicator.segment_cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(communicator.segment_cache.stats()), 200
+
+
+@app.route("/stats/summary-cache")
+def summary_cache_stats():
+    """Reports hit/miss/eviction counters of this worker's summary cache."""
+    if filebase_manager.summary_cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(filebase_manager.summary_cache.stats()), 200
+
+
+@app.cli.command("rebuild-similarity-index")
+@click.option("--refetch", is_flag=True, help="Fetch linked policies whose text is no longer cached.")
+def rebuild_similarity_index(refetch):
+    """Recomputes near-duplicate signatures for the existing policies table."""
+    if communicator.similarity_index is None:
+        click.echo("Similarity index is disabled (SIMILARITY_INDEX_ENABLED=False).")
+        return
+    stats = communicator.rebuild_similarity_index(refetch=refetch)
+    click.echo(f"Similarity index rebuilt: {stats}")
+
+
+@app.cli.command("migrate-policy-hashes")
+@click.option("--refetch", is_flag=True, help="Fetch linked policies whose text is no longer cached.")
+def migrate_policy_hashes(refetch):
+    """Backfills BLAKE2b-256 content hashes for policies stored under the legacy FNV-1a hash."""
+    if db_manager.ensure_policy_hash_index():
+        click.echo("Created the index on policies.policy_hash.")
+    stats = communicator.migrate_policy_hashes(refetch=refetch)
+    click.echo(f"Policy hashes migrated: {stats}")
+
 
 
 # To run the Flask app:
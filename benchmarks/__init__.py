@@ -0,0 +1,2 @@
+# safeagree_backend/benchmarks/__init__.py
+# This file makes the 'benchmarks' directory a Python package.
\ No newline at end of file
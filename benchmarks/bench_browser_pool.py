@@ -0,0 +1,95 @@
+# safeagree_backend/benchmarks/bench_browser_pool.py
+# Compares per-URL scrape latency with a fresh browser per URL against the
+# pooled drivers from services/browser_pool.py, and against the plain HTTP
+# fast path of ScraperService.fetch_policy_text.
+#
+# Usage (from the project root, needs Firefox installed):
+#   python -m benchmarks.bench_browser_pool --urls 20 --pool-size 2
+
+import argparse
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.browser_pool import BrowserPool
+from services.scraper_service import ScraperService
+
+FIXTURE_PARAGRAPH = (
+    "We collect information you provide directly to us, such as your name, email address "
+    "and payment details, and information collected automatically when you use the service. "
+)
+
+
+def build_fixture_html(page_id, paragraphs=200):
+    """Builds a policy-sized static HTML page."""
+    body = "".join(f"<p>{i}. {FIXTURE_PARAGRAPH}</p>" for i in range(paragraphs))
+    return (f"<html><head><title>Policy {page_id}</title></head>"
+            f"<body><main><h1>Privacy Policy {page_id}</h1>{body}</main></body></html>").encode('utf-8')
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves /policy/<n> as a generated privacy policy page."""
+    def do_GET(self):
+        payload = build_fixture_html(self.path.rsplit('/', 1)[-1])
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass # Keep benchmark output readable
+
+
+def start_fixture_server():
+    """Starts the fixture server on a free local port and returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run(fetch, urls):
+    """Fetches every URL sequentially and returns the per-URL latencies in seconds."""
+    latencies = []
+    for url in urls:
+        started = time.perf_counter()
+        text = fetch(url)
+        latencies.append(time.perf_counter() - started)
+        if not text:
+            print(f"WARNING: no text scraped from {url}")
+    return latencies
+
+
+def report(label, latencies):
+    print(f"{label:<12} n={len(latencies):<4} mean={statistics.mean(latencies) * 1000:8.1f} ms  "
+          f"p50={statistics.median(latencies) * 1000:8.1f} ms  max={max(latencies) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Browser pool scrape latency benchmark")
+    parser.add_argument("--urls", type=int, default=10, help="Number of URLs to scrape per mode")
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_server()
+    urls = [f"{base_url}/policy/{i}" for i in range(args.urls)]
+    try:
+        report("no pool", run(ScraperService(browser_pool=None)._scrape_policy_text, urls))
+
+        pool = BrowserPool(size=args.pool_size)
+        try:
+            started = time.perf_counter()
+            pool.start()
+            print(f"pool warm-up: {(time.perf_counter() - started) * 1000:.1f} ms (paid once per worker)")
+            scraper = ScraperService(browser_pool=pool)
+            report("pooled", run(scraper._scrape_policy_text, urls))
+            report("http tier", run(lambda url: scraper.fetch_policy_text(url)[0], urls))
+        finally:
+            pool.shutdown()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
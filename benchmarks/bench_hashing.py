@@ -0,0 +1,63 @@
+# safeagree_backend/benchmarks/bench_hashing.py
+# Compares content hashing throughput on multi-MB policy texts: the legacy FNV-1a
+# (pure Python) hash against BLAKE2b-256, SHA-256 and, if installed, xxh3-128.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_hashing --sizes 1 4 16 --repeat 3
+
+import argparse
+import hashlib
+import time
+
+from benchmarks.bench_segmentation import build_policy
+from utils.content_hash import content_hash, legacy_content_hash
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+def build_text(megabytes):
+    text = build_policy(200, seed=megabytes)
+    return (text * (megabytes * 1024 * 1024 // len(text) + 1))[:megabytes * 1024 * 1024]
+
+
+def best_of(function, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Policy content hashing benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16], help="Policy sizes in MiB")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy-above", type=int, default=4,
+                        help="Skip FNV-1a above this size in MiB (it runs at a few MB/s)")
+    args = parser.parse_args()
+
+    hashers = [
+        ("fnv1a-64 (legacy)", legacy_content_hash),
+        ("blake2b-256", content_hash),
+        ("sha256", lambda text: hashlib.sha256(text.encode('utf-8')).hexdigest()),
+    ]
+    if xxhash is not None:
+        hashers.append(("xxh3-128", lambda text: xxhash.xxh3_128_hexdigest(text.encode('utf-8'))))
+
+    for megabytes in args.sizes:
+        text = build_text(megabytes)
+        print(f"{megabytes} MiB policy")
+        for label, function in hashers:
+            if function is legacy_content_hash and megabytes > args.skip_legacy_above:
+                print(f"  {label:<20} skipped")
+                continue
+            seconds = best_of(function, text, args.repeat)
+            print(f"  {label:<20} {seconds * 1000:9.1f} ms  {megabytes / seconds:9.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# safeagree_backend/benchmarks/bench_segmentation.py
+# Compares the previous per-paragraph segmentation (pattern compiled per paragraph,
+# substrings copied) against the single-pass scanner in services/segmentation.py,
+# on synthetic policies, for single documents and for batches.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_segmentation --docs 200 --paragraphs 400
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+from services.segmentation import segment_offsets, segment_batch
+
+SENTENCES = [
+    "We collect information you provide directly to us, such as your name and email address.",
+    "We may share aggregated data with partners for analytics and advertising purposes.",
+    "You can request access to, correction of, or deletion of your personal data at any time.",
+    "Cookies and similar technologies help us remember your preferences.",
+    "We retain personal data for as long as necessary to provide the service.",
+]
+BULLETS = ["1.", "2)", "-", "*", "•"]
+
+
+def build_policy(paragraphs, seed):
+    """Builds a policy of plain paragraphs with a list every few paragraphs."""
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(paragraphs):
+        if i % 4 == 3:
+            items = "\n".join(f"{rng.choice(BULLETS)} {rng.choice(SENTENCES)}" for _ in range(rng.randint(3, 8)))
+            blocks.append(f"The following applies:\n{items}")
+        else:
+            blocks.append(" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 6))))
+    return "\n\n".join(blocks)
+
+
+def legacy_segment(text):
+    """The segmentation previously in Communicator.segment_text_oop115_style."""
+    if not text:
+        return []
+    paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+    segmented_output = []
+    for paragraph in paragraphs:
+        list_item_pattern = re.compile(r'^\s*(?:(?:\d+\.|\d+\)|\*|-|•)\s+)(.*)', re.MULTILINE)
+        list_items = []
+        last_end = 0
+        for match in list_item_pattern.finditer(paragraph):
+            pre_list_text = paragraph[last_end:match.start()].strip()
+            if pre_list_text:
+                segmented_output.append(pre_list_text)
+            list_items.append(match.group(0).strip())
+            last_end = match.end()
+        if list_items:
+            segmented_output.extend(list_items)
+            remaining_text = paragraph[last_end:].strip()
+            if remaining_text:
+                segmented_output.append(remaining_text)
+        else:
+            segmented_output.append(paragraph)
+    return [s for s in segmented_output if s]
+
+
+def time_runs(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(label, timings, docs, chars):
+    best = min(timings)
+    print(f"{label:<28} best {best * 1000:9.1f} ms  median {statistics.median(timings) * 1000:9.1f} ms"
+          f"  {docs / best:9.0f} docs/s  {chars / best / 1e6:7.1f} Mchar/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Policy segmentation benchmark")
+    parser.add_argument("--docs", type=int, default=200, help="Documents per batch")
+    parser.add_argument("--paragraphs", type=int, default=400, help="Paragraphs per synthetic policy")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="Process count for the batch run")
+    args = parser.parse_args()
+
+    docs = [build_policy(args.paragraphs, seed) for seed in range(args.docs)]
+    chars = sum(len(doc) for doc in docs)
+    print(f"{args.docs} documents, {chars / 1e6:.1f} M characters")
+
+    # Both engines agree on documents where list items are not interleaved with prose
+    assert legacy_segment(docs[0]) == segment_offsets(docs[0]).to_list()
+
+    report("legacy (per paragraph)", time_runs(lambda: [legacy_segment(d) for d in docs], args.repeat), len(docs), chars)
+    report("single pass, offsets", time_runs(lambda: [segment_offsets(d) for d in docs], args.repeat), len(docs), chars)
+    report("single pass, strings", time_runs(lambda: [segment_offsets(d).to_list() for d in docs], args.repeat), len(docs), chars)
+    report("batch (process pool)", time_runs(lambda: segment_batch(docs, max_workers=args.workers), args.repeat), len(docs), chars)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# safeagree_backend/benchmarks/bench_summarizer.py
+# Measures SummarizerClient latency per policy against the local stub, comparing
+# one request per chunk sent sequentially with batched and concurrent requests.
+#
+# Usage (from the project root):
+#   python -m benchmarks.bench_summarizer --policies 5 --latency 0.1
+
+import argparse
+import time
+
+from benchmarks.bench_segmentation import build_policy
+from benchmarks.summarizer_stub import start_stub_server, StubState
+from services.segmentation import segment_text
+from services.summarizer_client import SummarizerClient, build_chunks
+
+
+def run(client, policies):
+    started = time.perf_counter()
+    for segments in policies:
+        client.annotate(segments)
+    return (time.perf_counter() - started) / len(policies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarizer client batching benchmark")
+    parser.add_argument("--policies", type=int, default=5)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated model seconds per request")
+    parser.add_argument("--token-budget", type=int, default=1500)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, endpoint = start_stub_server(latency=args.latency, failure_rate=args.failure_rate)
+    policies = [segment_text(build_policy(args.paragraphs, seed)) for seed in range(args.policies)]
+    chunk_count = sum(len(build_chunks(p, args.token_budget)) for p in policies) / len(policies)
+    print(f"{args.policies} policies, {chunk_count:.0f} chunks each on average, {args.latency * 1000:.0f} ms per request")
+    try:
+        for label, batch_size, concurrency in (("sequential, 1 chunk/request", 1, 1),
+                                               ("batched (4), sequential", 4, 1),
+                                               ("batched (4), 4 concurrent", 4, 4),
+                                               ("1 chunk/request, 8 concurrent", 1, 8)):
+            StubState.requests = 0
+            client = SummarizerClient(endpoint, token_budget=args.token_budget, batch_size=batch_size,
+                                      max_concurrency=concurrency, backoff_factor=0.05)
+            per_policy = run(client, policies)
+            print(f"{label:<32} {per_policy * 1000:8.1f} ms/policy  {StubState.requests / args.policies:5.1f} requests/policy")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
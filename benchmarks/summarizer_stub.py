@@ -0,0 +1,102 @@
+# safeagree_backend/benchmarks/summarizer_stub.py
+# Local stand-in for the summarizer AI service, speaking the SummarizerClient
+# protocol (see services/summarizer_client.py). Segments are categorized by
+# keyword, with configurable latency and failure rate.
+#
+# Usage (from the project root):
+#   python -m benchmarks.summarizer_stub --port 8000 --latency 0.2
+# then run the app with SUMMARIZER_AI_ENDPOINT=http://localhost:8000/summarize
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORY_KEYWORDS = [
+    ("Data Sharing", ("share", "third part", "partner", "sell")),
+    ("Data Retention", ("retain", "retention", "delete after", "store for")),
+    ("Data Security", ("secur", "encrypt", "protect")),
+    ("User Rights", ("right", "access", "correct", "opt out", "opt-out")),
+    ("Cookies and Tracking", ("cookie", "track", "pixel")),
+    ("Data Collection", ("collect", "information", "personal data")),
+]
+
+
+def annotate_segment(text):
+    """Keyword-based annotation of one segment."""
+    lowered = text.lower()
+    category = next((name for name, keywords in CATEGORY_KEYWORDS if any(k in lowered for k in keywords)), "Other")
+    first_sentence = text.split(". ")[0].strip()
+    annotation = {"category": category, "summary": first_sentence[:200], "sentiment": "Neutral"}
+    if category in ("Data Sharing", "Cookies and Tracking"):
+        annotation["sentiment"] = "Negative"
+        annotation["key_point"] = f"{category} is mentioned."
+    return annotation
+
+
+class StubState:
+    latency = 0.0 # Seconds added per request
+    failure_rate = 0.0 # Share of requests answered with 503
+    requests = 0
+    segments = 0
+    lock = threading.Lock()
+
+
+class SummarizerStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real service behind a load balancer
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with StubState.lock:
+            StubState.requests += 1
+        if StubState.failure_rate and random.random() < StubState.failure_rate:
+            return self._send(503, {"error": "overloaded"})
+        try:
+            chunks = json.loads(body)["chunks"]
+        except (ValueError, KeyError):
+            return self._send(400, {"error": "expected {'chunks': [...]}"})
+        time.sleep(StubState.latency)
+        results = [{"id": chunk["id"], "segments": [annotate_segment(s) for s in chunk["segments"]]} for chunk in chunks]
+        with StubState.lock:
+            StubState.segments += sum(len(chunk["segments"]) for chunk in chunks)
+        self._send(200, {"results": results})
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0, latency=0.0, failure_rate=0.0):
+    """Starts the stub in a daemon thread. Returns (server, endpoint_url)."""
+    StubState.latency = latency
+    StubState.failure_rate = failure_rate
+    server = ThreadingHTTPServer(("127.0.0.1", port), SummarizerStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/summarize"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub summarizer AI service")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of simulated model time per request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    args = parser.parse_args()
+    server, endpoint = start_stub_server(args.port, args.latency, args.failure_rate)
+    print(f"Summarizer stub listening on {endpoint}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
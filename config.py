@@ -3,6 +3,10 @@
 import os
 from datetime import timedelta
 
+from database.pool import build_engine_options
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
 class Config:
     """
     Centralized configuration settings for the SafeAgree application.
@@ -11,14 +15,30 @@ class Config:
     # Database Configuration
     # SQLite Database URI
     # This will create a file named 'site.db' in your safeagree_backend directory
-    DATABASE_URL = 'sqlite:///site.db'
+    # The path is absolute so Flask-SQLAlchemy does not move it into the instance folder
+    DATABASE_URL = os.getenv("DATABASE_URL", 'sqlite:///' + os.path.join(BASE_DIR, 'site.db'))
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # Disable track modifications to save resources
+    # Connection pool of the single engine shared by Flask-SQLAlchemy and DatabaseManager
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30")) # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Seconds before a connection is replaced
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                                                     pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE,
+                                                     pool_pre_ping=DB_POOL_PRE_PING)
     # AWS S3 / File Storage Configuration
     AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
     AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
     S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "safeagree")
     AWS_REGION = os.getenv("AWS_REGION", "eu-north-1")
+    # Summary storage backend: "s3" or "local" (sharded files under LOCAL_STORAGE_DIR, for single-node setups)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3").lower()
+    LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", os.path.join(BASE_DIR, "storage"))
+    SUMMARY_COMPRESSION = os.getenv("SUMMARY_COMPRESSION", "gzip").lower() # "gzip" or "none"; both formats stay readable
+    SUMMARY_COMPRESSION_LEVEL = int(os.getenv("SUMMARY_COMPRESSION_LEVEL", "6"))
+    STORAGE_MAX_CONCURRENCY = int(os.getenv("STORAGE_MAX_CONCURRENCY", "10")) # Batch-read threads and S3 connection pool size
 
     SECRET_KEY = 'YOUR_FLASK_APP_SUPER_SECRET_KEY_HERE'
 
@@ -28,6 +48,102 @@ class Config:
 
     # AI Model Endpoints (Conceptual/Example)
     SUMMARIZER_AI_ENDPOINT = os.getenv("SUMMARIZER_AI_ENDPOINT", "http://localhost:8000/summarize")
+    # Canned summaries, no AI service needed; the default until SUMMARIZER_AI_ENDPOINT is set explicitly
+    SUMMARIZER_MOCK = os.getenv("SUMMARIZER_MOCK", "False" if os.getenv("SUMMARIZER_AI_ENDPOINT") else "True").lower() == "true"
+    SUMMARIZER_TOKEN_BUDGET = int(os.getenv("SUMMARIZER_TOKEN_BUDGET", "1500")) # Max tokens per chunk
+    SUMMARIZER_BATCH_SIZE = int(os.getenv("SUMMARIZER_BATCH_SIZE", "4")) # Chunks per request
+    SUMMARIZER_MAX_CONCURRENCY = int(os.getenv("SUMMARIZER_MAX_CONCURRENCY", "4")) # Requests in flight per worker process (shared client)
+    SUMMARIZER_CONNECT_TIMEOUT = float(os.getenv("SUMMARIZER_CONNECT_TIMEOUT", "5"))
+    SUMMARIZER_READ_TIMEOUT = float(os.getenv("SUMMARIZER_READ_TIMEOUT", "120"))
+    SUMMARIZER_RETRIES = int(os.getenv("SUMMARIZER_RETRIES", "3"))
+    # Node-local cache of per-segment annotations (SQLite file shared by the workers on a node)
+    SEGMENT_CACHE_ENABLED = os.getenv("SEGMENT_CACHE_ENABLED", "True").lower() == "true"
+    SEGMENT_CACHE_PATH = os.getenv("SEGMENT_CACHE_PATH", os.path.join(BASE_DIR, "segment_cache.db"))
+    SEGMENT_CACHE_MAX_ENTRIES = int(os.getenv("SEGMENT_CACHE_MAX_ENTRIES", "200000"))
+    # Change when the summarizer model changes, so old annotations are not reused
+    SEGMENT_CACHE_NAMESPACE = os.getenv("SEGMENT_CACHE_NAMESPACE", "v1")
+
+    # Scraping / Browser Pool Configuration
+    BROWSER_POOL_ENABLED = os.getenv("BROWSER_POOL_ENABLED", "True").lower() == "true"
+    BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2")) # Max headless browsers alive (and in use) per process
+    BROWSER_POOL_ACQUIRE_TIMEOUT = float(os.getenv("BROWSER_POOL_ACQUIRE_TIMEOUT", "30")) # Seconds to wait for a free browser
+    BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "100")) # Recycle a browser after this many pages
+    BROWSER_PAGE_LOAD_TIMEOUT = int(os.getenv("BROWSER_PAGE_LOAD_TIMEOUT", "30"))
+    # Plain HTTP fast path tried before the browser
+    HTTP_FETCH_TIMEOUT = float(os.getenv("HTTP_FETCH_TIMEOUT", "10"))
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    HTTP_MIN_STATIC_TEXT_CHARS = int(os.getenv("HTTP_MIN_STATIC_TEXT_CHARS", "500")) # Less static text than this => JS-rendered page
+
+    # Policy fetch cache (conditional GET revalidation of policy links)
+    FETCH_CACHE_ENABLED = os.getenv("FETCH_CACHE_ENABLED", "True").lower() == "true"
+    FETCH_CACHE_FRESH_TTL = int(os.getenv("FETCH_CACHE_FRESH_TTL", "3600")) # Seconds a fetch is reused without asking the origin
+    FETCH_CACHE_MAX_AGE = int(os.getenv("FETCH_CACHE_MAX_AGE", str(30 * 24 * 3600))) # Seconds after which an entry is dropped
+    FETCH_CACHE_MAX_ENTRIES = int(os.getenv("FETCH_CACHE_MAX_ENTRIES", "5000"))
+    FETCH_CACHE_MAX_BYTES = int(os.getenv("FETCH_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # Background summarization jobs
+    JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "thread") # 'thread' or 'process'
+    JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "4"))
+
+    # Request coalescing (single-flight) for concurrent submissions of the same policy
+    SINGLE_FLIGHT_LEASE_TTL = int(os.getenv("SINGLE_FLIGHT_LEASE_TTL", "300")) # Seconds before another worker may take over
+    SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv("SINGLE_FLIGHT_POLL_INTERVAL", "0.5"))
+
+    # Per-domain politeness for every outgoing policy fetch
+    SCRAPER_PER_DOMAIN_CONCURRENCY = int(os.getenv("SCRAPER_PER_DOMAIN_CONCURRENCY", "2"))
+    SCRAPER_PER_DOMAIN_INTERVAL = float(os.getenv("SCRAPER_PER_DOMAIN_INTERVAL", "1.0")) # Min seconds between request starts
+
+    # Bulk library import
+    IMPORT_MAX_WORKERS = int(os.getenv("IMPORT_MAX_WORKERS", "8"))
+    IMPORT_MAX_LINKS = int(os.getenv("IMPORT_MAX_LINKS", "500"))
+
+    # Background re-crawl of linked policies
+    RECRAWL_ENABLED = os.getenv("RECRAWL_ENABLED", "False").lower() == "true"
+    RECRAWL_INTERVAL = int(os.getenv("RECRAWL_INTERVAL", "900")) # Seconds between scheduler cycles; each paces its crawls over this window
+    RECRAWL_MIN_AGE = int(os.getenv("RECRAWL_MIN_AGE", str(24 * 3600))) # Re-crawl links not checked for this long
+    RECRAWL_GLOBAL_RATE = int(os.getenv("RECRAWL_GLOBAL_RATE", "30")) # Crawls per minute, all domains
+    RECRAWL_DOMAIN_RATE = int(os.getenv("RECRAWL_DOMAIN_RATE", "2")) # Crawls per minute per domain
+    RECRAWL_MAX_WORKERS = int(os.getenv("RECRAWL_MAX_WORKERS", "2"))
+
+    # Read-through cache for summaries fetched from the filebase
+    SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE_ENABLED", "True").lower() == "true"
+    SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "1000"))
+    SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(64 * 1024 * 1024))) # Per worker process
+    SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", "3600"))
+    SUMMARY_DISK_CACHE_DIR = os.getenv("SUMMARY_DISK_CACHE_DIR") # Unset disables the shared on-disk tier
+    SUMMARY_DISK_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_DISK_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    SUMMARY_DISK_CACHE_TTL = int(os.getenv("SUMMARY_DISK_CACHE_TTL", str(24 * 3600)))
+
+    # Uploaded file text extraction limits
+    FILE_MAX_BYTES = int(os.getenv("FILE_MAX_BYTES", str(20 * 1024 * 1024)))
+    FILE_MAX_PAGES = int(os.getenv("FILE_MAX_PAGES", "300")) # Later PDF pages are ignored
+    FILE_EXTRACT_TIME_LIMIT = float(os.getenv("FILE_EXTRACT_TIME_LIMIT", "30")) # Seconds; text read so far is kept
+    FILE_PARALLEL_MIN_PAGES = int(os.getenv("FILE_PARALLEL_MIN_PAGES", "40")) # PDFs this long use the process pool
+    FILE_EXTRACT_WORKERS = int(os.getenv("FILE_EXTRACT_WORKERS", "4"))
+
+    # Upload handling: bodies over MAX_CONTENT_LENGTH are refused with 413 from Content-Length alone
+    UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+    UPLOAD_MEMORY_THRESHOLD = int(os.getenv("UPLOAD_MEMORY_THRESHOLD", str(512 * 1024))) # Larger uploads spool to disk
+    IMPORT_FILE_MAX_BYTES = int(os.getenv("IMPORT_FILE_MAX_BYTES", str(1024 * 1024)))
+    MAX_CONTENT_LENGTH = UPLOAD_MAX_BYTES + 64 * 1024 # Room for multipart boundaries and form fields
+
+    # Near-duplicate detection (MinHash LSH over segment shingles)
+    SIMILARITY_INDEX_ENABLED = os.getenv("SIMILARITY_INDEX_ENABLED", "True").lower() == "true"
+    SIMILARITY_NUM_PERM = int(os.getenv("SIMILARITY_NUM_PERM", "64"))
+    SIMILARITY_BANDS = int(os.getenv("SIMILARITY_BANDS", "16")) # Must divide SIMILARITY_NUM_PERM
+    SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.8")) # Reported as similar from here
+    # Estimated similarity from which a stored summary may be reused; reuse also requires an identical
+    # segment set (exact hash check). Set above 1.0 to only report similarity.
+    NEAR_DUPLICATE_REUSE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_REUSE_THRESHOLD", "1.0"))
+
+    # Logging: JSON lines written to stdout by a background thread (see utils/structured_logging.py)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json") # 'json' or 'text'
+    # Per-module levels, e.g. "services.scraper_service=WARNING,database.crud=ERROR"
+    LOG_MODULE_LEVELS = os.getenv("LOG_MODULE_LEVELS", "botocore=WARNING,urllib3=WARNING,PyPDF2=ERROR")
+    # Share of DEBUG/INFO records kept per logger, e.g. "services.segment_cache=0.1"
+    LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000")) # Records beyond this are dropped, never waited on
 
     # Flask Application Settings
     DEBUG = os.getenv("FLASK_DEBUG", "True").lower() == "true" # Set to False in production
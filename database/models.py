@@ -1,10 +1,11 @@
 # safeagree_backend/database/models.py
 # Defines SQLAlchemy ORM models for the SafeAgree application.
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Date, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import json
 import sqlalchemy.orm
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -53,13 +54,18 @@ class Policy(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     company_name = Column(String(255), nullable=False) # Company name associated with the policy
-    policy_hash = Column(String(64), unique=True, nullable=False) # FNV1-a hash of the policy text
+    policy_hash = Column(String(64), unique=True, index=True, nullable=False) # Hex BLAKE2b-256 of the policy text (FNV-1a decimal on unmigrated rows)
     result_file_name = Column(String(255), nullable=False) # Name/key of the JSON file in S3
     processing_date = Column(DateTime, default=datetime.now(), nullable=False) # Date/time of processing
     original_link = Column(String(512), nullable=True) # Original URL of the policy if applicable
     # Relationship to UserPolicy table
     user_policies = relationship("UserPolicy", back_populates="policy", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Backs the newest-first keyset pagination of the public history
+        Index('ix_policies_processing_date_id', 'processing_date', 'id'),
+    )
+
     def __repr__(self):
         return (f"<Policy(id={self.id}, company_name='{self.company_name}', "
                 f"processing_date='{self.processing_date}...')>")
@@ -78,4 +84,145 @@ class UserPolicy(Base):
     policy = relationship("Policy", back_populates="user_policies")
 
     def __repr__(self):
-        return f"<UserPolicy(user_id={self.user_id}, policy_id={self.policy_id})>"
\ No newline at end of file
+        return f"<UserPolicy(user_id={self.user_id}, policy_id={self.policy_id})>"
+
+
+class PolicyFetchCache(Base):
+    """
+    SQLAlchemy model for the 'policy_fetch_cache' table.
+    Remembers the last fetch of each policy URL (HTTP validators, content hash and
+    extracted text) so refreshes can use conditional requests.
+    """
+    __tablename__ = 'policy_fetch_cache'
+
+    url = Column(String(512), primary_key=True) # Policy.original_link that was fetched
+    etag = Column(String(255), nullable=True) # ETag header of the last 200 response
+    last_modified = Column(String(64), nullable=True) # Last-Modified header of the last 200 response
+    content_hash = Column(String(64), nullable=False) # Hash of extracted_text (same scheme as Policy.policy_hash)
+    extracted_text = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0) # UTF-8 size of extracted_text, used for eviction
+    validated_at = Column(DateTime, nullable=False) # Last time the origin confirmed (200 or 304) this content
+    last_accessed = Column(DateTime, nullable=False, index=True) # LRU key for eviction
+
+    def __repr__(self):
+        return f"<PolicyFetchCache(url='{self.url}', content_hash='{self.content_hash}')>"
+
+
+class PolicyJob(Base):
+    """
+    SQLAlchemy model for the 'policy_jobs' table.
+    Tracks background summarization jobs so clients can poll their progress.
+    """
+    __tablename__ = 'policy_jobs'
+
+    id = Column(String(36), primary_key=True) # UUID handed back to the client
+    status = Column(String(16), nullable=False, default='queued') # queued, running, succeeded, failed
+    stage = Column(String(16), nullable=False, default='queued') # queued, fetching, extracting, summarizing, storing, done
+    input_type = Column(String(8), nullable=False) # 'link' or 'file'
+    company_name = Column(String(255), nullable=True)
+    policy_id = Column(Integer, ForeignKey('policies.id'), nullable=True) # Set once the job succeeds
+    result = Column(Text, nullable=True) # JSON payload of a successful job
+    error = Column(Text, nullable=True) # Error message of a failed job
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+    def serialize(self):
+        """Serializes the job into the shape returned by the status endpoint."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "policy_id": self.policy_id,
+            "result": json.loads(self.result) if self.result else None,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+    def __repr__(self):
+        return f"<PolicyJob(id='{self.id}', status='{self.status}', stage='{self.stage}')>"
+
+
+class PolicyLease(Base):
+    """
+    SQLAlchemy model for the 'policy_leases' table.
+    A row marks a policy URL or content hash as being processed by one worker,
+    so other gunicorn workers wait instead of processing it again.
+    """
+    __tablename__ = 'policy_leases'
+
+    key = Column(String(640), primary_key=True) # e.g. 'url:<normalized url>' or 'hash:<policy hash>'
+    owner = Column(String(128), nullable=False) # host:pid:nonce of the holding worker
+    expires_at = Column(DateTime, nullable=False) # Expired leases may be taken over
+
+    def __repr__(self):
+        return f"<PolicyLease(key='{self.key}', owner='{self.owner}')>"
+
+
+class PolicyVersion(Base):
+    """
+    SQLAlchemy model for the 'policy_versions' table.
+    Version history of linked policies: one row per detected content change of a URL.
+    """
+    __tablename__ = 'policy_versions'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    original_link = Column(String(512), nullable=False, index=True)
+    policy_id = Column(Integer, ForeignKey('policies.id'), nullable=False) # Policy holding the new content
+    previous_policy_id = Column(Integer, ForeignKey('policies.id'), nullable=True) # Version it replaced
+    policy_hash = Column(String(64), nullable=False)
+    detected_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    __table_args__ = (
+        # A link's change to a given policy is recorded once, however many refreshes find it
+        Index('uq_policy_versions_link_policy', 'original_link', 'policy_id', unique=True),
+    )
+
+    def serialize(self):
+        """Serializes the version into a dictionary."""
+        return {
+            "policy_id": self.policy_id,
+            "previous_policy_id": self.previous_policy_id,
+            "original_link": self.original_link,
+            "detected_at": self.detected_at.isoformat() if self.detected_at else None,
+        }
+
+    def __repr__(self):
+        return f"<PolicyVersion(original_link='{self.original_link}', policy_id={self.policy_id})>"
+
+
+class PolicySignature(Base):
+    """
+    SQLAlchemy model for the 'policy_signatures' table.
+    MinHash signature of each policy's segment shingles, for near-duplicate lookup.
+    """
+    __tablename__ = 'policy_signatures'
+
+    policy_id = Column(Integer, ForeignKey('policies.id'), primary_key=True)
+    signature = Column(LargeBinary, nullable=False) # num_perm unsigned 64-bit values, array('Q') bytes
+    num_perm = Column(Integer, nullable=False)
+    segment_count = Column(Integer, nullable=False)
+    # Hex BLAKE2b of the sorted segment shingles: equal only for identical segment sets (up to case/whitespace)
+    segment_set_hash = Column(String(64), nullable=True)
+    # Reset on every (re)write of the row: similarity indexes in running workers load rows by it
+    created_at = Column(DateTime, default=datetime.now, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<PolicySignature(policy_id={self.policy_id}, segments={self.segment_count})>"
+
+
+class UploadDigest(Base):
+    """
+    SQLAlchemy model for the 'upload_digests' table.
+    Maps the SHA-256 of an uploaded file's raw bytes to the policy extracted from it,
+    so a re-upload of the same file skips extraction and summarization.
+    """
+    __tablename__ = 'upload_digests'
+
+    digest = Column(String(64), primary_key=True) # Hex SHA-256 of the raw upload, computed while spooling
+    policy_id = Column(Integer, ForeignKey('policies.id'), nullable=False, index=True)
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    def __repr__(self):
+        return f"<UploadDigest(digest='{self.digest[:12]}', policy_id={self.policy_id})>"
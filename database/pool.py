@@ -0,0 +1,69 @@
+# safeagree_backend/database/pool.py
+# Connection pool configuration and metrics for the shared SQLAlchemy engine.
+
+import threading
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool that also records how long checkouts wait for a free connection."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            with self._wait_lock:
+                self.wait_count += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+
+
+def build_engine_options(database_url, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800, pool_pre_ping=True):
+    """
+    Returns create_engine() keyword arguments for the shared engine.
+    In-memory SQLite keeps SQLAlchemy's single-connection pool, since a pool of
+    separate connections would each see a different empty database.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {"pool_pre_ping": pool_pre_ping}
+    return {
+        "poolclass": MonitoredQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+    }
+
+
+def get_pool_metrics(engine):
+    """Returns a snapshot of the engine's connection pool for monitoring."""
+    pool = engine.pool
+    metrics = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+    if isinstance(pool, MonitoredQueuePool):
+        metrics.update({
+            "checkouts": pool.wait_count,
+            "wait_time_total_ms": round(pool.wait_time_total * 1000, 3),
+            "wait_time_max_ms": round(pool.wait_time_max * 1000, 3),
+            "wait_time_avg_ms": round(pool.wait_time_total * 1000 / pool.wait_count, 3) if pool.wait_count else 0.0,
+        })
+    return metrics
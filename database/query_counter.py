@@ -0,0 +1,37 @@
+# safeagree_backend/database/query_counter.py
+# Counts the SQL statements an engine executes on the current thread, so each HTTP
+# request can report how many queries it ran (X-Query-Count response header).
+
+import threading
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """
+    Per-thread statement counter for one engine. Counting is off until start() is
+    called on a thread, so background jobs and scheduler threads are not counted.
+    """
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        count = getattr(self._local, "count", None)
+        if count is not None:
+            self._local.count = count + 1
+
+    def start(self):
+        """Starts (or restarts) counting on this thread."""
+        self._local.count = 0
+
+    def stop(self):
+        """Stops counting on this thread and returns the final count (None if not started)."""
+        count = getattr(self._local, "count", None)
+        self._local.count = None
+        return count
+
+    @property
+    def count(self):
+        """Statements executed on this thread since start(), or None if not counting."""
+        return getattr(self._local, "count", None)
@@ -11,14 +11,26 @@ import os
 import json # For parsing JSON from S3, if needed directly
 import datetime
 from urllib.parse import urlparse
+from utils.pagination import encode_cursor, decode_cursor
+from utils.upload_spool import spool_upload, UploadTooLarge
 # We'll need to pass the communicator instance to these routes from app.py
-from flask import Blueprint
+from flask import Blueprint, Response, stream_with_context, url_for, current_app
 policy_bp = Blueprint('policy', __name__, url_prefix='/policy')
 
 
 communicator_instance = None # This will be set by app.py
 db_manager_instance = None # This will be set by app.py
 filebase_manager_instance = None # This will be set by app.py
+job_queue_instance = None # This will be set by app.py
+
+HISTORY_PAGE_DEFAULT = 50 # Public history page size when no ?limit= is given
+HISTORY_PAGE_MAX = 500
+
+
+def _upload_limit_exceeded(max_bytes):
+    """True when the declared Content-Length already rules out an upload of at most max_bytes."""
+    # Multipart framing adds a little on top of the file itself
+    return request.content_length is not None and request.content_length > max_bytes + 64 * 1024
 
 
 def set_policy_communicator(communicator):
@@ -30,6 +42,10 @@ def set_policy_managers(db_manager, filebase_manager):
     db_manager_instance = db_manager
     filebase_manager_instance = filebase_manager
 
+def set_policy_job_queue(job_queue):
+    global job_queue_instance
+    job_queue_instance = job_queue
+
 # --- Policy Summarization and Library Management Endpoints ---
 
 @policy_bp.route("/summarize", methods=["POST"])
@@ -37,6 +53,7 @@ def summarize_policy():
     """
     Endpoint to summarize a privacy policy from a link or uploaded file.
     Expects 'policy_input' (URL or file content) and 'input_type' ('link' or 'file').
+    The work is queued; poll /policy/jobs/<job_id> for progress and the result.
     """
     input_type = request.form.get("input_type") # Use form for file uploads
     processing_date = datetime.datetime.now()
@@ -60,19 +77,27 @@ def summarize_policy():
             company_name = "Unknown Company" # Should not happen with valid URLs
 
     elif input_type == 'file':
+        max_bytes = current_app.config["UPLOAD_MAX_BYTES"]
+        if _upload_limit_exceeded(max_bytes):
+            return jsonify({"message": f"File too large. Uploads are limited to {max_bytes} bytes."}), 413
         if 'policy_file' not in request.files:
             return jsonify({"message": "Missing 'policy_file' for file input type."}), 404
         file = request.files['policy_file']
         if file.filename == '':
             return jsonify({"message": "No selected file."}), 400
-        policy_input = file.read() # Read file content as bytes
-        if not policy_input:
-            return jsonify({"message": "Empty file content."}), 400
         # Extract file extension from filename
         if '.' in file.filename:
             file_extension = file.filename.rsplit('.', 1)[1].lower()
         else:
             return jsonify({"message": "Missing 'file extension' for file input type."}), 400
+        # Copy the upload out of the request in chunks (hashing as it streams); big files go to disk
+        try:
+            policy_input = spool_upload(file.stream, max_bytes, current_app.config["UPLOAD_MEMORY_THRESHOLD"])
+        except UploadTooLarge as e:
+            return jsonify({"message": str(e)}), 413
+        if policy_input.size == 0:
+            policy_input.cleanup()
+            return jsonify({"message": "Empty file content."}), 400
         # find the company name from the file name
         base_name = os.path.splitext(file.filename)[0]
         company_name = re.sub(r'(_|\s)?(privacy|policy|terms|conditions|agreement)(_|\s)?', '', base_name, flags=re.IGNORECASE).strip()
@@ -81,19 +106,33 @@ def summarize_policy():
     else:
         return jsonify({"message": "Invalid 'input_type'. Must be 'link' or 'file'."}), 400
 
-    policy_obj, summary_data = communicator_instance.process_policy(
+    job_id = job_queue_instance.submit_summarize(
         policy_input, input_type, company_name, processing_date, file_extension if input_type == 'file' else None
     )
+    if not job_id:
+        if input_type == 'file':
+            policy_input.cleanup()
+        return jsonify({"message": "Failed to queue policy for processing."}), 500
+
+    return jsonify({
+        "message": "Policy queued for processing",
+        "job_id": job_id,
+        "status_url": url_for('policy.get_job_status', job_id=job_id)
+    }), 202
 
-    if policy_obj and summary_data:
-        return jsonify({
-            "message": "Policy processed successfully",
-            "policy_id": policy_obj.id,
-            "original_link": policy_obj.original_link if policy_obj.original_link else None,
-            "company_name": policy_obj.company_name,
-            "summary": summary_data
-        }), 200
-    return jsonify({"message": summary_data or "Failed to process policy."}), 500
+
+@policy_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    """
+    Endpoint to poll a summarization job.
+    Reports status (queued, running, succeeded, failed), the current stage
+    (fetching, extracting, summarizing, storing, done) and, once finished,
+    the result or the error message.
+    """
+    job = job_queue_instance.get_job(job_id)
+    if not job:
+        return jsonify({"message": "Job not found."}), 404
+    return jsonify(job), 200
 
 
 @policy_bp.route("/<int:policy_id>", methods=["GET"])
@@ -119,6 +158,49 @@ def get_policy_details(policy_id):
     }), 200
 
 
+@policy_bp.route("/<int:policy_id>/summary", methods=["GET"])
+def get_policy_summary(policy_id):
+    """
+    Endpoint returning only a policy's summary JSON. Stored summaries are already
+    gzip-compressed, so clients accepting gzip receive the stored bytes unchanged.
+    """
+    policy = db_manager_instance.get_policy_by_id(policy_id)
+    if not policy:
+        return jsonify({"message": "Policy not found."}), 404
+
+    accept_gzip = request.accept_encodings["gzip"] > 0
+    payload = filebase_manager_instance.get_summary_payload(policy.result_file_name, accept_gzip=accept_gzip)
+    if payload is None:
+        return jsonify({"message": "Summary data not found for this policy."}), 422
+
+    body, content_encoding = payload
+    response = Response(body, mimetype="application/json")
+    response.headers["Vary"] = "Accept-Encoding"
+    if content_encoding:
+        response.headers["Content-Encoding"] = content_encoding
+    return response
+
+
+@policy_bp.route("/<int:policy_id>/similar", methods=["GET"])
+def get_similar_policies(policy_id):
+    """Endpoint listing near-duplicate policies (e.g. to diff revisions); ?threshold= and ?limit= are optional."""
+    threshold = request.args.get("threshold", type=float)
+    limit = min(request.args.get("limit", default=5, type=int), 50)
+    similar = communicator_instance.get_similar_policies(policy_id, threshold=threshold, limit=limit)
+    if similar is None:
+        return jsonify({"message": "Policy not found or not indexed for similarity."}), 404
+    return jsonify(similar=similar), 200
+
+
+@policy_bp.route("/<int:policy_id>/versions", methods=["GET"])
+def get_policy_versions(policy_id):
+    """Endpoint to list the detected versions of the link behind a policy, newest first."""
+    versions = communicator_instance.get_policy_versions(policy_id)
+    if versions is None:
+        return jsonify({"message": "Policy not found."}), 404
+    return jsonify(versions=versions), 200
+
+
 # --- User Library Management Endpoints ---
 
 @policy_bp.route("/library/add/<int:policy_id>", methods=["POST"])
@@ -134,18 +216,24 @@ def add_to_library(policy_id):
 @policy_bp.route("/library/view", methods=["GET"])
 @jwt_required()
 def view_library():
-    """Endpoint to view all policies in the user's library."""
+    """Endpoint to view all policies in the user's library (with summaries when ?include_summaries=1)."""
     user_id = get_jwt_identity()
-    library_items = communicator_instance.get_user_library(user_id)
+    include_summaries = request.args.get("include_summaries", "").lower() in ("1", "true", "yes")
+    library_items = communicator_instance.get_user_library(user_id, include_summaries=include_summaries)
     return jsonify(library=library_items), 200
 
 @policy_bp.route("/library/update", methods=["POST"])
 @jwt_required()
 def update_library():
-    """Endpoint to update policies in the user's library (check for new versions)."""
+    """
+    Endpoint to update policies in the user's library (check for new versions).
+    Reports which policies changed and how long each refresh step took.
+    """
     user_id = get_jwt_identity()
-    updated_policies = communicator_instance.update_user_library(user_id)
-    return jsonify(message="Library updated succesfully.", updated_policies=updated_policies), 200
+    updated_policies, report = communicator_instance.update_user_library(user_id)
+    return jsonify(message="Library updated succesfully.", updated_policies=updated_policies,
+                   changed_policy_ids=report["changed"], policies=report["policies"],
+                   timings_ms=report["timings_ms"]), 200
 
 @policy_bp.route("/library/remove/<int:policy_id>", methods=["DELETE"])
 @jwt_required()
@@ -159,8 +247,15 @@ def remove_from_library(policy_id):
 @policy_bp.route("/library/import", methods=["POST"])
 @jwt_required()
 def import_library():
-    """Endpoint to import policies from an uploaded text file containing links."""
+    """
+    Endpoint to import policies from an uploaded text file containing links.
+    With ?stream=1 (or Accept: application/x-ndjson) per-link results are streamed
+    as NDJSON while the import runs; the last line carries the updated library.
+    """
     user_id = get_jwt_identity()
+    max_bytes = current_app.config["IMPORT_FILE_MAX_BYTES"]
+    if _upload_limit_exceeded(max_bytes):
+        return jsonify({"message": f"Import file too large. It is limited to {max_bytes} bytes."}), 413
     if 'import_file' not in request.files:
         return jsonify({"message": "No import_file provided."}), 400
     
@@ -168,34 +263,73 @@ def import_library():
     if file.filename == '':
         return jsonify({"message": "No selected file."}), 400
     
-    file_content = file.read().decode('utf-8')
+    try:
+        # Link lists are small; the cap keeps them so and they are always kept in memory
+        file_content = spool_upload(file.stream, max_bytes, memory_threshold=max_bytes).read().decode('utf-8')
+    except UploadTooLarge as e:
+        return jsonify({"message": str(e)}), 413
+    except UnicodeDecodeError:
+        return jsonify({"message": "Import file must be UTF-8 text."}), 400
+
+    # Stream one NDJSON line per link as it completes when the client asks for it
+    if request.args.get("stream") == "1" or "application/x-ndjson" in request.headers.get("Accept", ""):
+        results = communicator_instance.iter_import_user_library(user_id, file_content)
+        lines = (json.dumps(result, default=str) + "\n" for result in results)
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson"), 200
+
     import_results, user_policies = communicator_instance.import_user_library(user_id, file_content)
     
     return jsonify(message="Library import initiated.", results=import_results, library=user_policies), 200
 
 
+def _serialize_history_row(row):
+    return {
+        "id": row.id,
+        "company_name": row.company_name,
+        "original_link": row.original_link if row.original_link else None,
+        "processing_date": row.processing_date.isoformat()
+    }
+
+
 @policy_bp.route("/public-history", methods=["GET"]) # Changed from /history/public to /policy/public-history
 def get_public_history():
     """
-    Endpoint to retrieve a list of all processed policies for public viewing.
+    Endpoint to retrieve processed policies for public viewing, most recent first.
     Does NOT require authentication.
+    Paginated with ?limit= (default 50, max 500) and ?cursor= (the 'next_cursor' of the
+    previous page). ?stream=1 streams the full history as one JSON document instead.
     """
     if not db_manager_instance or not filebase_manager_instance:
         return jsonify({"message": "Backend managers not initialized."}), 500
 
-    all_policies = db_manager_instance.get_all_policies()
-    
-    public_history_list = []
-    for policy in all_policies:
-
-        public_history_list.append({
-            "id": policy.id,
-            "company_name": policy.company_name,
-            "original_link": policy.original_link if policy.original_link else None,
-            "processing_date": policy.processing_date.isoformat()
-        })
-    
-    return jsonify(history=public_history_list), 200
+    if request.args.get("stream") == "1":
+        def generate_export():
+            yield '{"history": ['
+            for position, row in enumerate(db_manager_instance.iter_policy_history()):
+                yield ("," if position else "") + json.dumps(_serialize_history_row(row))
+            yield ']}'
+        return Response(stream_with_context(generate_export()), mimetype="application/json"), 200
+
+    limit = request.args.get("limit", HISTORY_PAGE_DEFAULT, type=int)
+    if limit is None or limit < 1:
+        return jsonify({"message": "'limit' must be a positive integer."}), 400
+    limit = min(limit, HISTORY_PAGE_MAX)
+
+    after = None
+    cursor = request.args.get("cursor")
+    if cursor:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({"message": "Invalid 'cursor'."}), 400
+
+    # Fetch one extra row to know whether another page exists
+    rows = db_manager_instance.get_policy_history_page(limit + 1, after)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].processing_date, rows[-1].id)
+
+    return jsonify(history=[_serialize_history_row(row) for row in rows], next_cursor=next_cursor), 200
 
 
 '''deprecated
@@ -221,8 +355,8 @@ def compare_policies(policy_id_1, policy_id_2):
     policy_2 = db_manager_instance.get_policy_by_id(policy_id_2)
     if not policy_1 or not policy_2:
         return jsonify({"message": "One or both policies not found."}), 404
-    summary_data_1 = filebase_manager_instance.get_json_from_s3(policy_1.result_file_name)
-    summary_data_2 = filebase_manager_instance.get_json_from_s3(policy_2.result_file_name)
+    result_1, result_2 = filebase_manager_instance.get_many_json([policy_1.result_file_name, policy_2.result_file_name])
+    summary_data_1, summary_data_2 = result_1.data, result_2.data
     if not summary_data_1 or not summary_data_2:
         return jsonify({"message": "Summary data not found for one or both policies."}), 422
     # Return both policies' details
@@ -0,0 +1,200 @@
+# safeagree_backend/services/browser_pool.py
+# Keeps a bounded set of headless Firefox drivers alive so scraping does not
+# pay for a browser launch on every URL.
+
+import atexit
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.firefox.service import Service
+from webdriver_manager.firefox import GeckoDriverManager
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPoolTimeout(Exception):
+    """Raised when no browser becomes available within the acquire timeout."""
+
+
+def build_firefox_options():
+    """Returns the headless Firefox options used for every scraping driver."""
+    options = webdriver.FirefoxOptions()
+    options.add_argument('--headless')          # Run in headless mode (no UI)
+    options.add_argument('--no-sandbox')        # Required for some environments (e.g., Docker)
+    options.add_argument('--disable-dev-shm-usage') # Overcomes limited resource problems
+    options.add_argument('--disable-gpu')       # Recommended for headless mode
+    options.add_argument('--window-size=1920,1080') # Set a consistent window size
+    return options
+
+
+class BrowserPool:
+    """
+    A fixed-size pool of headless Firefox drivers.
+
+    Drivers are launched lazily, when a lease() finds no idle one (or all at once
+    by start()), handed out through lease(), reset to a blank page between uses and
+    replaced when they crash or have served max_uses pages. At most `size` drivers
+    are in use at any time; further callers block until one is returned.
+    """
+    def __init__(self, size=2, acquire_timeout=30, max_uses=100, page_load_timeout=30, driver_factory=None):
+        if size < 1:
+            raise ValueError("BrowserPool size must be at least 1.")
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.max_uses = max_uses
+        self.page_load_timeout = page_load_timeout
+        self._driver_factory = driver_factory or self._launch_firefox
+        self._idle = queue.LifoQueue(maxsize=size) # LIFO keeps the warmest driver in use
+        for _ in range(size):
+            self._idle.put_nowait(None) # Empty slot: lease() launches a driver into it on demand
+        self._uses = {} # id(driver) -> pages served
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._geckodriver_path = None
+
+    def _launch_firefox(self):
+        """Launches a new headless Firefox driver, resolving geckodriver only once."""
+        if self._geckodriver_path is None:
+            self._geckodriver_path = GeckoDriverManager().install()
+        driver = webdriver.Firefox(service=Service(self._geckodriver_path), options=build_firefox_options())
+        driver.set_page_load_timeout(self.page_load_timeout)
+        return driver
+
+    def _new_driver(self):
+        driver = self._driver_factory()
+        with self._lock:
+            self._uses[id(driver)] = 0
+        return driver
+
+    def start(self):
+        """Optionally warms the pool by launching a driver into every idle empty slot. Safe to call more than once."""
+        with self._lock:
+            if self._started or self._closed:
+                return
+            self._started = True
+        slots = []
+        while True:
+            try:
+                slots.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        launched = []
+        for driver in slots:
+            if driver is None:
+                try:
+                    driver = self._new_driver()
+                except Exception as e:
+                    # Leave the slot empty; lease() will retry the launch on demand.
+                    logger.error("BrowserPool: failed to launch driver: %s", e)
+            launched.append(driver)
+        # Empty slots go in first so the LIFO queue hands out running drivers before them
+        for driver in sorted(launched, key=lambda d: d is not None):
+            self._idle.put_nowait(driver)
+        logger.info("BrowserPool started with %s headless driver(s).", len(self._uses))
+
+    @staticmethod
+    def _is_alive(driver):
+        """Cheap liveness probe; any WebDriver error means the browser is gone."""
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _reset(self, driver):
+        """Clears per-page state so the next lease starts from a clean browser."""
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        Borrows a driver for the duration of the with-block.
+        :param timeout: Seconds to wait for a free driver (defaults to acquire_timeout).
+        :raises BrowserPoolTimeout: If every driver stays busy for the whole timeout.
+        """
+        if self._closed:
+            raise RuntimeError("BrowserPool has been shut down.")
+        try:
+            driver = self._idle.get(timeout=self.acquire_timeout if timeout is None else timeout)
+        except queue.Empty:
+            raise BrowserPoolTimeout(f"No browser available after {timeout or self.acquire_timeout}s.")
+
+        healthy = False
+        try:
+            if driver is None or not self._is_alive(driver):
+                if driver is not None:
+                    logger.warning("BrowserPool: driver crashed, restarting it.")
+                    self._quit(driver)
+                driver = None
+                driver = self._new_driver()
+            yield driver
+            healthy = True
+        finally:
+            self._release(driver, healthy)
+
+    def _release(self, driver, healthy):
+        """Returns a driver to the pool, recycling it if it failed or is worn out."""
+        if driver is not None:
+            with self._lock:
+                self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+                worn_out = self._uses[id(driver)] >= self.max_uses
+            # A failed scrape does not necessarily mean the browser died; only recycle dead ones.
+            if self._closed or worn_out or (not healthy and not self._is_alive(driver)):
+                self._quit(driver)
+                driver = None
+            else:
+                try:
+                    self._reset(driver)
+                except Exception:
+                    self._quit(driver)
+                    driver = None
+        # A None slot is refilled lazily by the next lease() so release never blocks on a launch.
+        self._idle.put_nowait(driver)
+
+    def stats(self):
+        """Returns a snapshot of pool occupancy."""
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "in_use": self.size - self._idle.qsize(),
+            "live_drivers": len(self._uses), # Launched so far; idle slots may still be empty
+        }
+
+    def shutdown(self):
+        """Quits every idle driver; leased drivers are quit when they are released."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if driver is not None:
+                self._quit(driver)
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_browser_pool(size, acquire_timeout, max_uses, page_load_timeout):
+    """Returns the process-wide BrowserPool, creating it on first call."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = BrowserPool(size=size, acquire_timeout=acquire_timeout,
+                                       max_uses=max_uses, page_load_timeout=page_load_timeout)
+            atexit.register(_shared_pool.shutdown)
+        return _shared_pool
@@ -4,9 +4,9 @@
 
 
 #### from webdriver_manager.firefox import GeckoDriverManager  # Uncomment for real scraping
+import logging
 import time
 from io import BytesIO
-import fnvhash
 import hashlib
 import json
 import os
@@ -15,37 +15,113 @@ from urllib.parse import urlparse
 import PyPDF2
 from docx import Document
 import re
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Assuming database.py and filebase.py are in the same directory or accessible via PYTHONPATH
 from database.crud import DatabaseManager
 from services.file_storage_service import FilebaseManager
+from services.scraper_service import ScraperService
+from services.fetch_cache import PolicyFetchCache
+from services.file_reader_service import FileReaderService
+from services.single_flight import SingleFlight
+from services.segmentation import segment_text
+from services.summarizer_client import SummarizerClient, SummarizerError
+from services.segment_cache import SegmentCache
+from services.similarity_index import SimilarityIndex
+from services.metrics import MetricsRegistry
+from utils.content_hash import content_hash, legacy_content_hash, is_legacy_hash
+from utils.url_normalizer import normalize_policy_url, company_name_from_url
+from utils.upload_spool import SpooledUpload
+
+logger = logging.getLogger(__name__)
+
+# Progress stages reported by process_policy
+STAGE_FETCHING = "fetching"
+STAGE_EXTRACTING = "extracting"
+STAGE_SUMMARIZING = "summarizing"
+STAGE_STORING = "storing"
+
+# Canned per-segment annotations used when no summarizer service is configured (SUMMARIZER_MOCK)
+MOCK_ANNOTATIONS = [
+    {"category": "Data Collection", "summary": "We collect personal data like name, email, and usage patterns.",
+     "key_point": "Extensive data collection.", "sentiment": "Neutral"},
+    {"category": "Data Usage", "summary": "Data is used for service improvement, personalization, and marketing.",
+     "sentiment": "Neutral"},
+    {"category": "Data Sharing", "summary": "We may share data with third-party partners for analytics and advertising.",
+     "key_point": "Data sharing with third parties.", "sentiment": "Negative"},
+    {"category": "User Rights", "summary": "You have rights to access, correct, and delete your data, subject to limitations.",
+     "key_point": "Limited user control over data.", "sentiment": "Neutral"},
+    {"category": "Security Measures", "summary": "We implement security measures to protect your data, but cannot guarantee absolute security.",
+     "sentiment": "Neutral"},
+]
 
 class Communicator:
     """
     The central orchestration hub for SafeAgree backend.
     Manages policy processing, history checks, and coordination with AI models, Database, and Filebase.
     """
-    def __init__(self, db_manager: DatabaseManager, fb_manager: FilebaseManager):
+    def __init__(self, db_manager: DatabaseManager, fb_manager: FilebaseManager, scraper_service: ScraperService = None,
+                 fetch_cache: PolicyFetchCache = None, file_reader: FileReaderService = None,
+                 single_flight: SingleFlight = None, import_max_workers=8, import_max_links=500,
+                 refresh_max_staleness=0, summarizer_client: SummarizerClient = None,
+                 segment_cache: SegmentCache = None, similarity_index: SimilarityIndex = None,
+                 near_duplicate_reuse_threshold=1.0, metrics: MetricsRegistry = None):
         self.db_manager = db_manager
         self.fb_manager = fb_manager
+        self.scraper_service = scraper_service or ScraperService()
+        self.file_reader = file_reader or FileReaderService()
+        # Coalesces concurrent processing of the same URL / content hash
+        self.single_flight = single_flight or SingleFlight()
+        # Stage timings (fetch, extract, hash, db_lookup, summarize, upload, ...) for /metrics
+        self.metrics = metrics or MetricsRegistry()
+        self.import_max_workers = import_max_workers # Links processed concurrently by a library import or refresh
+        self.import_max_links = import_max_links
+        # Seconds a library refresh may trust an earlier fetch (e.g. by the recrawl scheduler)
+        self.refresh_max_staleness = refresh_max_staleness
+        self.fetch_cache = fetch_cache # Optional; without it every link is fetched in full
+        self.summarizer_client = summarizer_client # None serves canned (mock) annotations
+        self.segment_cache = segment_cache # Optional; reuses annotations of unchanged segments
+        self.similarity_index = similarity_index # Optional; finds near-duplicate policies on ingest
+        # Estimated similarity at which a near-duplicate's summary is reused instead of summarizing
+        self.near_duplicate_reuse_threshold = near_duplicate_reuse_threshold
         # self.tokenizer = AutoTokenizer.from_pretrained("hf-internal-testing/llama-tokenizer") # For real Llama Tokenizer
 
     def _calculate_hash(self, text):
-        """Calculates hash of the policy text."""
-        return fnvhash.fnv1a_64(text.encode('utf-8'))  # Using FNV-1a for a quick hash, can be replaced if needed
+        """Calculates hash of the policy text (hex BLAKE2b-256, see utils/content_hash.py)."""
+        with self.metrics.span("hash"):
+            return content_hash(text)
+
+    def _fetch_policy_text(self, url, max_staleness=None):
+        """
+        Fetches the policy text behind a URL via the fetch cache / ScraperService (HTTP first, browser fallback).
+        :return: Tuple (policy_text, content_hash). The hash comes from the fetch cache (so a 304 or fresh
+                 entry is not hashed again) and is None when no cache is configured.
+        """
+        with self.metrics.span("fetch"):
+            if self.fetch_cache is not None:
+                fetched = self.fetch_cache.fetch(url, max_staleness=max_staleness)
+                return fetched.text, fetched.content_hash
+            policy_text, tier = self.scraper_service.fetch_policy_text(url)
+            return policy_text, None
 
-    def segment_text_oop115_style(text: str) -> list[str]:
+    def _read_policy_file(self, file_content, file_extension):
+        """
+        Extracts the policy text from uploaded file content via the FileReaderService.
+        :param file_content: Raw bytes or a SpooledUpload (read from its file handle).
+        """
+        with self.metrics.span("extract"):
+            if isinstance(file_content, SpooledUpload):
+                with file_content.open() as f:
+                    return self.file_reader._read_policy_file(f, file_extension or 'txt')
+            return self.file_reader._read_policy_file(file_content, file_extension or 'txt')
+
+    def segment_text_oop115_style(self, text: str) -> list[str]:
         """
         Segments a given text (e.g., a privacy policy) into segments that are closer
         to paragraphs or list items, as described for the OOP115 dataset.
-
-        The segmentation strategy involves:
-        1. Initial segmentation into paragraphs by splitting on double newlines.
-        2. Within each paragraph, checking for common list item patterns (numbered lists,
-        bullet points). If found, the paragraph is further segmented into individual
-        list items.
-        3. If no list patterns are found, the paragraph itself is considered a segment.
-        4. Trimming whitespace from each resulting segment.
+        See services/segmentation.py; use segment_offsets there to avoid copying substrings.
 
         Args:
             text: The input text string to be segmented.
@@ -53,92 +129,122 @@ class Communicator:
         Returns:
             A list of strings, where each string is a segmented paragraph or list item.
         """
-        if not text:
-            return []
+        return segment_text(text)
+# --- End of Helper function ---
 
-        # Step 1: Segment into paragraphs by splitting on double newlines.
-        # This handles most natural paragraph breaks.
-        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-
-        segmented_output = []
-        for paragraph in paragraphs:
-            # Define common list item patterns.
-            # This regex looks for:
-            # - Numbered lists (e.g., "1.", "2.", "1)", "2)")
-            # - Bullet points (e.g., "-", "*", "•" - common unicode bullet)
-            # It captures the list item content after the marker.
-            list_item_pattern = re.compile(r'^\s*(?:(?:\d+\.|\d+\)|\*|-|•)\s+)(.*)', re.MULTILINE)
-
-            # Find all potential list items within the current paragraph
-            list_items = []
-            last_end = 0
-            for match in list_item_pattern.finditer(paragraph):
-                # If there's text before the current list item that isn't a list item itself,
-                # add it as a separate segment (e.g., introductory sentence to a list)
-                pre_list_text = paragraph[last_end:match.start()].strip()
-                if pre_list_text:
-                    segmented_output.append(pre_list_text)
-
-                list_items.append(match.group(0).strip()) # Capture the full matched item
-                last_end = match.end()
-
-            # If list items were found, add them to the output
-            if list_items:
-                segmented_output.extend(list_items)
-                # Add any remaining text after the last list item in the paragraph
-                remaining_text = paragraph[last_end:].strip()
-                if remaining_text:
-                    segmented_output.append(remaining_text)
-            else:
-                # If no list items were found, the entire paragraph is a segment
-                segmented_output.append(paragraph)
+    def _tokenize_text(self, policy_text):
+        """
+        Splits the policy into the segments sent to the summarizer.
+        Token budgeting (packing segments into request-sized chunks) is done by the SummarizerClient.
+        """
+        return self.segment_text_oop115_style(policy_text)
 
-        # Final cleanup to ensure no empty strings are left
-        return [s for s in segmented_output if s]
-# --- End of Helper function ---
+    def _call_summarizer_ai(self, segments, policy_hash=None):
+        """
+        Sends the policy segments to the Summarizer AI model.
+        With a segment cache only segments not seen before are sent; the rest reuse
+        cached annotations. Without a SummarizerClient (SUMMARIZER_MOCK) returns canned annotations.
+        :param policy_hash: Hash of the whole policy, used in the reuse report.
+        :return: One list of annotations per segment.
+        """
+        if self.summarizer_client is None:
+            logger.debug("MOCK: Calling Summarizer AI.")
+            return [[annotation] for annotation in MOCK_ANNOTATIONS]
+        if self.segment_cache is None:
+            return self.summarizer_client.annotate(segments)
+
+        keys = self.segment_cache.keys_for(segments)
+        cached = self.segment_cache.get_many(keys)
+        # Each distinct uncached segment is sent once, even if it repeats in the policy
+        missing = {}
+        for key, segment in zip(keys, segments):
+            if key not in cached and key not in missing:
+                missing[key] = segment
+        if missing:
+            fresh = self.summarizer_client.annotate(list(missing.values()))
+            new_items = list(zip(missing.keys(), fresh))
+            self.segment_cache.put_many(new_items)
+            cached.update(new_items)
+
+        reused = sum(1 for key in keys if key not in missing)
+        report = self.segment_cache.record(policy_hash, len(segments), reused)
+        logger.info("Policy %s: reused %s/%s segment summaries (ratio %s), summarized %s.",
+                    policy_hash, reused, len(segments), report['reuse_ratio'], len(missing),
+                    extra={"policy_hash": policy_hash, "segments": len(segments), "reused": reused})
+        return [cached[key] for key in keys]
 
-    # IMPLEMENT!!!!!!!!!!!
-    def _call_summarizer_ai(self, tokenized_text):
+    @staticmethod
+    def _organize_annotations(raw_annotations):
         """
-        Mocks the call to the Summarizer AI model.
-        Returns dummy annotations (summary).
+        Merges per-segment annotations into the stored summary shape:
+        one summary section per category (in order of first appearance), the
+        distinct key points, and the most common sentiment.
         """
-        print("MOCK: Calling Summarizer AI.")
-        # In a real scenario, this would be an API call to your AI model endpoint
-        # Example:
-        # response = requests.post("http://summarizer-ai-service/summarize", json={"text": tokenized_text})
-        # return response.json()
+        sections = {}
+        key_points = []
+        sentiments = Counter()
+        for segment_annotations in raw_annotations:
+            for annotation in segment_annotations:
+                summary = (annotation.get("summary") or "").strip()
+                if summary:
+                    contents = sections.setdefault(annotation.get("category") or "Other", [])
+                    if summary not in contents:
+                        contents.append(summary)
+                key_point = annotation.get("key_point")
+                if key_point and key_point not in key_points:
+                    key_points.append(key_point)
+                if annotation.get("sentiment"):
+                    sentiments[annotation["sentiment"]] += 1
         return {
-            "summary_sections": [
-                {"title": "Data Collection", "content": "We collect personal data like name, email, and usage patterns."},
-                {"title": "Data Usage", "content": "Data is used for service improvement, personalization, and marketing."},
-                {"title": "Data Sharing", "content": "We may share data with third-party partners for analytics and advertising."},
-                {"title": "User Rights", "content": "You have rights to access, correct, and delete your data, subject to limitations."},
-                {"title": "Security Measures", "content": "We implement security measures to protect your data, but cannot guarantee absolute security."}
-            ],
-            "key_points": [
-                "Extensive data collection.",
-                "Data sharing with third parties.",
-                "Limited user control over data."
-            ],
-            "overall_sentiment": "Neutral with potential privacy concerns."
+            "summary_sections": [{"title": title, "content": " ".join(contents)} for title, contents in sections.items()],
+            "key_points": key_points,
+            "overall_sentiment": sentiments.most_common(1)[0][0] if sentiments else "Neutral",
         }
 
-    def process_policy(self, policy_input, input_type, company_name, file_extension=None):
+    def process_policy(self, policy_input, input_type, company_name, processing_date=None, file_extension=None, progress=None):
         """
         Main function to process a privacy policy.
         Handles history check, AI summarization, and storage.
-        :param policy_input: URL (if input_type='link') or file content (if input_type='file').
+        :param policy_input: URL (if input_type='link') or file content as bytes or SpooledUpload (if input_type='file').
         :param input_type: 'link' or 'file'.
         :param company_name: Optional company name for the policy.
-        :param processing_date: Required processing date for the policy (datetime.date object).
+        :param processing_date: Processing date for the policy (datetime). Defaults to now.
+        :param file_extension: Extension of the uploaded file (file input only).
+        :param progress: Optional callable receiving each stage name
+                         ('fetching', 'extracting', 'summarizing', 'storing') as it starts. A call that
+                         joins an identical in-flight run receives that run's stages, and 'waiting'
+                         while another worker process holds it.
         :return: Tuple (policy_object, summary_data) or (None, error_message)
         """
+        if processing_date is None:
+            processing_date = datetime.now()
+        if input_type == 'link':
+            # Concurrent submissions of the same page share one fetch/summarize run
+            return self.single_flight.do(
+                f"url:{normalize_policy_url(policy_input)}",
+                lambda report: self._process_policy(policy_input, input_type, company_name, processing_date,
+                                                    file_extension, report),
+                progress=progress
+            )
+        if input_type == 'file' and isinstance(policy_input, SpooledUpload):
+            # The same upload submitted concurrently is extracted once (digest computed while spooling)
+            return self.single_flight.do(
+                f"file:{policy_input.digest}",
+                lambda report: self._process_policy(policy_input, input_type, company_name, processing_date,
+                                                    file_extension, report),
+                progress=progress
+            )
+        return self._process_policy(policy_input, input_type, company_name, processing_date, file_extension, progress)
 
+    def _process_policy(self, policy_input, input_type, company_name, processing_date, file_extension, progress):
+        """Fetches or extracts the policy text, then summarizes and stores it (see process_policy)."""
         policy_text = None
+        policy_hash = None
+        original_link = None
         if input_type == 'link':
             original_link = policy_input
-            policy_text = self._scrape_policy_text(policy_input)
+            self._report_progress(progress, STAGE_FETCHING)
+            policy_text, policy_hash = self._fetch_policy_text(policy_input)
             # Try to infer company name from URL if not provided
             if not company_name:
                 try:
@@ -147,7 +253,13 @@ class Communicator:
                 except Exception:
                     company_name = "Unknown Company"
         elif input_type == 'file':
-            policy_text = self._read_policy_file(policy_input)
+            if isinstance(policy_input, SpooledUpload):
+                # First-level dedupe on the raw bytes: a known file is not parsed again
+                known = self._lookup_upload_digest(policy_input)
+                if known is not None:
+                    return known
+            self._report_progress(progress, STAGE_EXTRACTING)
+            policy_text = self._read_policy_file(policy_input, file_extension)
             if not company_name:
                 company_name = "Uploaded File Policy"
         else:
@@ -156,123 +268,469 @@ class Communicator:
         if not policy_text:
             return None, "Failed to retrieve policy text."
 
-        policy_hash = self.calculate_hash(policy_text)
-        existing_policy = self.db_manager.get_policy_by_hash(policy_hash)
+        # Second-level dedupe on the extracted text (catches re-encoded files and links)
+        if policy_hash is None or is_legacy_hash(policy_hash): # Fetch cache entries may predate BLAKE2b
+            policy_hash = self._calculate_hash(policy_text)
+        # Identical text submitted concurrently (any URL or file) is summarized once
+        policy_obj, summary_data = self.single_flight.do(
+            f"hash:{policy_hash}",
+            lambda report: self._summarize_and_store(policy_text, policy_hash, company_name, original_link,
+                                                     processing_date, report),
+            progress=progress
+        )
+        if policy_obj is not None and isinstance(policy_input, SpooledUpload):
+            self.db_manager.add_upload_digest(policy_input.digest, policy_obj.id, policy_input.size)
+        return policy_obj, summary_data
+
+    def _lookup_upload_digest(self, upload):
+        """
+        Returns (policy_object, summary_data) for an upload whose raw bytes were processed
+        before, or None if the digest is unknown or its summary is missing from storage.
+        """
+        with self.metrics.span("db_lookup"):
+            policy = self.db_manager.get_policy_by_upload_digest(upload.digest)
+        if policy is None:
+            return None
+        with self.metrics.span("summary_read"):
+            summary_data = self.fb_manager.get_json_from_s3(policy.result_file_name)
+        if not summary_data:
+            logger.warning("Summary file %s missing for known upload; extracting again.", policy.result_file_name)
+            return None
+        logger.info("Upload %s matches policy %s. Skipping extraction and summarization.", upload.digest[:12], policy.id,
+                    extra={"policy_id": policy.id})
+        return policy, summary_data
+
+    def _summarize_and_store(self, policy_text, policy_hash, company_name, original_link, processing_date, progress):
+        """
+        Returns the stored summary for policy_hash, or summarizes the text and stores
+        the summary and policy metadata if this content has not been seen before.
+        :return: Tuple (policy_object, summary_data) or (None, error_message)
+        """
+        with self.metrics.span("db_lookup"):
+            existing_policy = self.db_manager.get_policy_by_hash(policy_hash)
 
         summary_data = None
         policy_obj = None
 
         if existing_policy:
-            # update processing date if it exists
-            existing_policy.processing_date = datetime.datetime.now()
+            # processing_date is left alone: it orders the paginated history and drives recrawl staleness
             # Policy already processed, retrieve from S3
-            print(f"Policy with hash {policy_hash} found in history. Retrieving summary from S3.")
-            summary_data = self.fb_manager.get_json_from_s3(existing_policy.result_file_name)
+            logger.info("Policy with hash %s found in history. Retrieving summary from S3.", policy_hash,
+                        extra={"policy_hash": policy_hash})
+            with self.metrics.span("summary_read"):
+                summary_data = self.fb_manager.get_json_from_s3(existing_policy.result_file_name)
             policy_obj = existing_policy
             if not summary_data:
-                print(f"WARNING: Summary file {existing_policy.result_file_name} not found in S3 despite DB entry.")
+                logger.warning("Summary file %s not found in S3 despite DB entry.", existing_policy.result_file_name)
                 # If S3 file is missing, re-process (optional, depending on error handling strategy)
                 # For now, we'll just return an error if S3 retrieval fails.
                 return None, "Cached summary not found in storage."
         else:
             # New policy, process with AI
-            print(f"New policy. Processing with AI.")
-            tokenized_text = self._tokenize_text(policy_text)
-            raw_annotations = self._call_summarizer_ai(tokenized_text)
-            summary_data = self._organize_annotations(raw_annotations)
+            logger.info("New policy. Processing with AI.", extra={"policy_hash": policy_hash})
+            self._report_progress(progress, STAGE_SUMMARIZING)
+            with self.metrics.span("segment"):
+                tokenized_text = self._tokenize_text(policy_text)
+            signature = set_hash = None
+            near_duplicate = None
+            if self.similarity_index is not None:
+                with self.metrics.span("similarity"):
+                    signature, set_hash = self.similarity_index.fingerprint_segments(tokenized_text)
+                    near_duplicates = self.similarity_index.query(signature)
+                if near_duplicates:
+                    logger.info("Policy %s is similar to policies %s.", policy_hash, near_duplicates)
+                # The MinHash estimate only shortlists: a summary is reused only for an identical segment set
+                for candidate_id, similarity in near_duplicates or ():
+                    if similarity < self.near_duplicate_reuse_threshold:
+                        break
+                    if self.similarity_index.has_segment_set(candidate_id, set_hash):
+                        near_duplicate = self.db_manager.get_policy_by_id(candidate_id)
+                        break
+
+            summary_data = None
+            if near_duplicate is not None:
+                # Same segments up to case and whitespace: reuse that policy's summary file
+                with self.metrics.span("summary_read"):
+                    summary_data = self.fb_manager.get_json_from_s3(near_duplicate.result_file_name)
+                s3_file_name = near_duplicate.result_file_name
+                if summary_data:
+                    logger.info("Reusing the summary of near-duplicate policy %s.", near_duplicate.id)
+            if not summary_data:
+                try:
+                    with self.metrics.span("summarize"):
+                        raw_annotations = self._call_summarizer_ai(tokenized_text, policy_hash)
+                except SummarizerError as e:
+                    logger.error("Summarizer failed for policy %s: %s", policy_hash, e)
+                    return None, "Summarizer service unavailable. Please try again later."
+                summary_data = self._organize_annotations(raw_annotations)
 
-            # Generate a unique file name for S3
-            s3_file_name = f"policy_summary_{policy_hash}.json"
-            if not self.fb_manager.upload_json_to_s3(s3_file_name, summary_data):
-                return None, "Failed to upload summary to file storage."
+                self._report_progress(progress, STAGE_STORING)
+                # Generate a unique file name for S3
+                s3_file_name = f"policy_summary_{policy_hash}.json"
+                with self.metrics.span("upload"):
+                    uploaded = self.fb_manager.upload_json_to_s3(s3_file_name, summary_data)
+                if not uploaded:
+                    return None, "Failed to upload summary to file storage."
+            else:
+                self._report_progress(progress, STAGE_STORING)
 
             # Store policy metadata in DB
-            policy_obj = self.db_manager.add_policy(
-                company_name=company_name,
-                original_link=original_link if input_type == 'link' else None,
-                processing_date=datetime.datetime.now(),
-                policy_hash=policy_hash,
-                result_file_name=s3_file_name
-            )
+            with self.metrics.span("db_write"):
+                policy_obj = self.db_manager.add_policy(
+                    company_name=company_name,
+                    original_link=original_link,
+                    processing_date=processing_date,
+                    policy_hash=policy_hash,
+                    result_file_name=s3_file_name
+                )
+            if not policy_obj:
+                # Another worker may have inserted the same policy_hash first
+                policy_obj = self.db_manager.get_policy_by_hash(policy_hash)
             if not policy_obj:
                 return None, "Failed to save policy metadata to database."
+            if signature is not None:
+                self.similarity_index.add(policy_obj.id, signature, len(tokenized_text), set_hash)
 
         return policy_obj, summary_data
 
+    @staticmethod
+    def _report_progress(progress, stage):
+        """Forwards a stage change to the caller's progress callback, if any."""
+        if progress is not None:
+            progress(stage)
+
     def add_policy_to_library(self, user_id, policy_id):
         """Adds an existing processed policy to a user's library."""
-        user = self.db_manager.get_user_by_id(user_id)
-        policy = self.db_manager.get_policy_by_id(policy_id)
-        if not user:
+        linked = self.db_manager.link_user_policy(user_id, policy_id)
+        if linked:
+            return True, "Policy added to library."
+        if linked is None:
+            return False, "Failed to add policy to library (might already be there)."
+        # Nothing inserted: a second query tells why (only on this uncommon path)
+        user_exists, policy_exists, already_linked = self.db_manager.diagnose_user_policy_link(user_id, policy_id)
+        if not user_exists:
             return False, "User not found."
-        if not policy:
+        if not policy_exists:
             return False, "Policy not found."
-        if self.db_manager.add_user_policy(user_id, policy_id):
+        if already_linked:
             return True, "Policy added to library."
         return False, "Failed to add policy to library (might already be there)."
 
-    def get_user_library(self, user_id):
+    def get_user_library(self, user_id, include_summaries=False):
         """
         Retrieves all policies in a user's library.
         :param user_id: The ID of the user.
+        :param include_summaries: Also attach each policy's summary, fetched in one batch.
         :return: List of dictionaries, each containing policy id and company name.
         """
-        policies_metadata = self.db_manager.get_policies_for_user(user_id)
+        entries = self.db_manager.get_library_entries(user_id)
         library_items = []
-        for policy in policies_metadata:
+        for policy_id, company_name, result_file_name in entries:
             library_items.append({
-                "policy_id": policy.id,
-                "company_name": policy.company_name,
+                "policy_id": policy_id,
+                "company_name": company_name,
             })
+        if include_summaries and entries:
+            results = self.fb_manager.get_many_json([result_file_name for policy_id, company_name, result_file_name in entries])
+            for item, result in zip(library_items, results):
+                item["summary"] = result.data
+                if result.error:
+                    item["summary_error"] = result.error
         return library_items
 
+    @staticmethod
+    def _elapsed_ms(started):
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    def _refresh_policy(self, policy, max_staleness=0):
+        """
+        Re-fetches one linked policy and re-summarizes it only if its content changed.
+        Detected changes are recorded in the policy's version history.
+        Runs on a refresh worker thread (or the recrawl scheduler).
+        :param max_staleness: Seconds a previously validated fetch may be reused without a
+                              request (0 always revalidates with the origin).
+        :return: Tuple (report, replacement) where replacement is (old_policy_id, new_policy_id) or None.
+        """
+        timings = {}
+        report = {"policy_id": policy.id, "company_name": policy.company_name, "timings_ms": timings}
+        policy_link = policy.original_link
+
+        started = time.perf_counter()
+        policy_hash = None
+        try:
+            policy_text, policy_hash = self._fetch_policy_text(policy_link, max_staleness=max_staleness)
+        except Exception as e:
+            policy_text = None
+            logger.error("Error fetching %s: %s", policy_link, e, extra={"policy_id": policy.id})
+        timings["fetch"] = self._elapsed_ms(started)
+        if not policy_text:
+            report.update(status="error", message="Failed to retrieve policy text.")
+            return report, None
+
+        if policy_hash is None or is_legacy_hash(policy_hash): # Fetch cache entries may predate BLAKE2b
+            started = time.perf_counter()
+            policy_hash = self._calculate_hash(policy_text)
+            timings["hash"] = self._elapsed_ms(started)
+        if policy_hash == str(policy.policy_hash):
+            report["status"] = "unchanged"
+            return report, None
+        if is_legacy_hash(policy.policy_hash) and legacy_content_hash(policy_text) == str(policy.policy_hash):
+            # Same content under the FNV-1a scheme: re-key the row instead of summarizing it again
+            if self.db_manager.replace_policy_hash(policy.id, policy.policy_hash, policy_hash):
+                logger.info("Policy %s re-keyed from its legacy hash.", policy.id, extra={"policy_id": policy.id})
+            report["status"] = "unchanged"
+            return report, None
+
+        started = time.perf_counter()
+        try:
+            updated_policy, summary = self.single_flight.do(
+                f"hash:{policy_hash}",
+                lambda report: self._summarize_and_store(policy_text, policy_hash, policy.company_name, policy_link,
+                                                         datetime.now(), report)
+            )
+        except Exception as e:
+            updated_policy, summary = None, f"Unexpected error: {e}"
+        timings["summarize"] = self._elapsed_ms(started)
+        if not updated_policy:
+            report.update(status="error", message=summary)
+            return report, None
+
+        if updated_policy.id == policy.id:
+            report["status"] = "unchanged"
+            return report, None
+        self.db_manager.add_policy_version(policy_link, updated_policy.id, policy_hash, previous_policy_id=policy.id)
+        report.update(status="updated", new_policy_id=updated_policy.id)
+        return report, (policy.id, updated_policy.id)
+
     def update_user_library(self, user_id):
         """
         Checks for newer versions of policies in a user's library and re-summarizes if needed.
-        This is a simplified mock. In a real scenario, you'd need to store the original URL
-        or file path to re-scrape/re-read the content.
-        For demonstration, we'll just simulate an update for existing policies.
+        Linked policies are refreshed concurrently. Fetches validated within
+        refresh_max_staleness (kept fresh by the recrawl scheduler) are reused without
+        a request, so a refresh is mostly lookups. Each new content hash is compared to
+        the stored policy_hash before any summarization, so only changed policies are
+        re-summarized, and all library swaps are applied in one transaction.
+        :return: Tuple (user_policies, report). report lists each policy's status
+                 ('unchanged', 'updated', 'skipped' or 'error') with per-step timings.
         """
-        print(f"MOCK: Updating library for user {user_id}. This is a placeholder for re-scraping and re-summarization.")
+        total_started = time.perf_counter()
+        logger.info("Updating library for user %s.", user_id)
         user_policies = self.db_manager.get_policies_for_user(user_id) # Get policies linked to user
-        
+
+        policy_reports = []
+        replacements = []
+        linked_policies = []
         for policy in user_policies:
-            policy_link = policy.original_link
-            if not policy_link:
-                print(f"The Privacy Policy  for {policy.company_name} has no original link. Skipping update check.")
+            if policy.original_link:
+                linked_policies.append(policy)
+            else:
+                logger.debug("The Privacy Policy for %s has no original link. Skipping update check.", policy.company_name)
+                policy_reports.append({"policy_id": policy.id, "company_name": policy.company_name,
+                                       "status": "skipped", "message": "No original link."})
+
+        if linked_policies:
+            with ThreadPoolExecutor(max_workers=min(self.import_max_workers, len(linked_policies)),
+                                    thread_name_prefix="library-refresh") as executor:
+                refreshes = executor.map(lambda policy: self._refresh_policy(policy, self.refresh_max_staleness),
+                                         linked_policies)
+                for report, replacement in refreshes:
+                    policy_reports.append(report)
+                    if replacement:
+                        replacements.append(replacement)
+
+        started = time.perf_counter()
+        if not self.db_manager.replace_user_policies(user_id, replacements):
+            for report in policy_reports:
+                if report["status"] == "updated":
+                    report.update(status="error", message="Failed to update library.")
+            replacements = []
+        apply_ms = self._elapsed_ms(started)
+
+        report = {
+            "changed": [old_id for old_id, new_id in replacements],
+            "policies": policy_reports,
+            "timings_ms": {"apply": apply_ms, "total": self._elapsed_ms(total_started)},
+        }
+        logger.info("Library refresh for user %s: %s of %s policies changed.", user_id, len(replacements),
+                    len(policy_reports), extra={"user_id": user_id, "timings_ms": report["timings_ms"]})
+        return self.get_user_library(user_id), report
+
+    def get_similar_policies(self, policy_id, threshold=None, limit=5):
+        """
+        Lists indexed policies similar to policy_id, most similar first.
+        :return: List of dicts, or None if the policy is unknown or not indexed.
+        """
+        if self.similarity_index is None:
+            return None
+        row = self.db_manager.get_policy_signature(policy_id)
+        if row is None:
+            return None
+        signature = array('Q')
+        signature.frombytes(row.signature)
+        matches = self.similarity_index.query(signature, threshold=threshold, limit=limit, exclude_id=policy_id)
+        policies = self.db_manager.get_policies_by_ids([match_id for match_id, similarity in matches])
+        return [{
+            "policy_id": match_id,
+            "company_name": policies[match_id].company_name,
+            "original_link": policies[match_id].original_link,
+            "processing_date": policies[match_id].processing_date.isoformat(),
+            "similarity": similarity,
+        } for match_id, similarity in matches if match_id in policies]
+
+    def rebuild_similarity_index(self, refetch=False):
+        """
+        Recomputes the signature of every policy whose text is still available.
+        Texts come from the fetch cache when its hash matches the policy; with refetch,
+        other linked policies are fetched again and indexed if their content is unchanged.
+        Uploaded files are not stored, so they can only be indexed when processed again.
+        :return: Dict of counts.
+        """
+        stats = {"indexed": 0, "refetched": 0, "changed_since": 0, "no_text": 0}
+        for policy, text in self.db_manager.iter_policies_with_source_text():
+            if text is None and refetch and policy.original_link:
+                fetched, tier = self.scraper_service.fetch_policy_text(policy.original_link)
+                if fetched and self._calculate_hash(fetched) == policy.policy_hash:
+                    text = fetched
+                    stats["refetched"] += 1
+                elif fetched:
+                    stats["changed_since"] += 1
+                    continue
+            if text is None:
+                stats["no_text"] += 1
                 continue
+            segments = self._tokenize_text(text)
+            signature, set_hash = self.similarity_index.fingerprint_segments(segments)
+            self.similarity_index.add(policy.id, signature, len(segments), set_hash)
+            stats["indexed"] += 1
+        return stats
+
+    def migrate_policy_hashes(self, refetch=False):
+        """
+        Re-keys policies stored under the legacy FNV-1a hash to BLAKE2b-256.
+        Texts come from the fetch cache when its hash matches the policy; with refetch,
+        other linked policies are fetched again and migrated if their content is unchanged.
+        Policies whose text is gone (e.g. uploaded files) keep their legacy hash: they stay
+        readable by id but are no longer matched by content.
+        :return: Dict of counts.
+        """
+        stats = {"migrated": 0, "refetched": 0, "changed_since": 0, "no_text": 0, "conflicts": 0, "cache_entries": 0}
+        for policy, text in self.db_manager.iter_policies_with_source_text():
+            if not is_legacy_hash(policy.policy_hash):
+                continue
+            if text is None and refetch and policy.original_link:
+                fetched, tier = self.scraper_service.fetch_policy_text(policy.original_link)
+                if fetched and legacy_content_hash(fetched) == policy.policy_hash:
+                    text = fetched
+                    stats["refetched"] += 1
+                elif fetched:
+                    stats["changed_since"] += 1
+                    continue
+            if text is None:
+                stats["no_text"] += 1
+                continue
+            if self.db_manager.replace_policy_hash(policy.id, policy.policy_hash, content_hash(text)):
+                stats["migrated"] += 1
             else:
-                updated_policy, summary = self.process_policy(user_id, policy_link, input_type='link', company_name=policy.company_name)
-                self.remove_policy_from_library(user_id, policy.id)  # Remove old version
-                self.add_policy_to_library(user_id, updated_policy.id)  # Add updated version
-                print(f"Successfully updated policy {policy.company_name}.")
-        user_policies = self.get_user_library(user_id)
-        return user_policies
+                # The same text was already stored again under its new hash
+                stats["conflicts"] += 1
+        for url, old_hash, text in self.db_manager.iter_legacy_fetch_cache_entries():
+            if self.db_manager.replace_fetch_cache_hash(url, old_hash, content_hash(text)):
+                stats["cache_entries"] += 1
+        return stats
+
+    def get_policy_versions(self, policy_id):
+        """
+        Retrieves the version history of the link behind a policy.
+        :return: List of version dictionaries (newest first), or None if the policy does not exist.
+        """
+        policy = self.db_manager.get_policy_by_id(policy_id)
+        if not policy:
+            return None
+        if not policy.original_link:
+            return []
+        return [version.serialize() for version in self.db_manager.get_policy_versions(policy.original_link)]
 
     def remove_policy_from_library(self, user_id, policy_id):
         """Removes a policy from a user's library."""
         return self.db_manager.remove_user_policy(user_id, policy_id)
 
+    def _prepare_import_links(self, file_content):
+        """
+        Normalizes and de-duplicates the links of an import file.
+        :return: Tuple (links, rejected) where links is a list of (original_link, normalized_link)
+                 and rejected holds the error results for unusable lines.
+        """
+        links = []
+        rejected = []
+        seen = set()
+        for line in file_content.splitlines():
+            link = line.strip()
+            if not link:
+                continue
+            normalized = normalize_policy_url(link)
+            hostname = urlparse(normalized).hostname or ""
+            if ' ' in hostname or ('.' not in hostname and hostname != 'localhost'):
+                rejected.append({"link": link, "status": "error", "message": "Invalid link."})
+                continue
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            links.append((link, normalized))
+        if len(links) > self.import_max_links:
+            for link, normalized in links[self.import_max_links:]:
+                rejected.append({"link": link, "status": "error",
+                                 "message": f"Import is limited to {self.import_max_links} links."})
+            links = links[:self.import_max_links]
+        return links, rejected
+
+    def _import_link(self, link):
+        """Processes one imported link; runs on an import worker thread."""
+        try:
+            policy_obj, summary_data = self.process_policy(link, 'link', company_name_from_url(link))
+        except Exception as e:
+            policy_obj, summary_data = None, f"Unexpected error: {e}"
+        if policy_obj:
+            return {"link": link, "status": "success", "policy_id": policy_obj.id}
+        logger.error("Failed to process link %s: %s", link, summary_data)
+        return {"link": link, "status": "error", "message": summary_data}
+
+    def iter_import_user_library(self, user_id, file_content):
+        """
+        Imports policies from a file containing policy links, yielding one result
+        dict per link as soon as it completes.
+        Links are normalized and de-duplicated, then processed concurrently on a
+        bounded worker pool (per-domain politeness is enforced by the scraper).
+        All library associations are written in one bulk insert at the end; the
+        last item yielded is {"status": "done", "added": n, "library": [...]}.
+        """
+        links, rejected = self._prepare_import_links(file_content)
+        for result in rejected:
+            yield result
+
+        policy_ids = []
+        executor = ThreadPoolExecutor(max_workers=self.import_max_workers, thread_name_prefix="library-import")
+        try:
+            futures = [executor.submit(self._import_link, link) for link, normalized in links]
+            for future in as_completed(futures):
+                result = future.result()
+                if result["status"] == "success":
+                    policy_ids.append(result["policy_id"])
+                yield result
+        finally:
+            # Also runs when the client disconnects mid-stream: drop queued links, keep finished ones
+            executor.shutdown(wait=False, cancel_futures=True)
+            added = self.db_manager.add_user_policies(user_id, policy_ids)
+        yield {"status": "done", "added": added, "library": self.get_user_library(user_id)}
+
     def import_user_library(self, user_id, file_content):
         """
         Imports policies from a file containing policy links.
         Each link is processed through the summarization flow.
+        :return: Tuple (results, user_policies)
         """
-        imported_links = file_content.splitlines()
-        results = []
-        for link in imported_links:
-            link = link.strip()
-            if link:
-                policy_obj, summary_data = self.process_policy(user_id, link, input_type='link')
-                if policy_obj:
-                    results.append({"link": link, "status": "success", "policy_id": policy_obj.id})
-                    #add to user's library
-                    self.db_manager.add_user_policy(user_id, policy_obj.id)
-                else:
-                    print(f"Failed to process link {link}: {summary_data}")
-                    results.append({"link": link, "status": "error", "message": summary_data})
-        user_policies = self.get_user_library(user_id)
-        return results, user_policies
+        results = list(self.iter_import_user_library(user_id, file_content))
+        summary = results.pop()
+        return results, summary["library"]
 
     '''deprecated
     def export_user_library(self, user_id):
@@ -0,0 +1,54 @@
+# safeagree_backend/services/domain_throttle.py
+# Per-domain politeness limits for outgoing policy fetches.
+
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+class _DomainState:
+    def __init__(self, max_concurrent):
+        self.semaphore = threading.BoundedSemaphore(max_concurrent)
+        self.lock = threading.Lock()
+        self.next_allowed = 0.0 # time.monotonic() before which no new request may start
+
+
+class DomainThrottle:
+    """
+    Limits how hard we hit any single site: at most `max_concurrent` requests in
+    flight per domain, and request starts spaced at least `min_interval` seconds apart.
+    Thread-safe; meant to be shared by every fetch in the process.
+    """
+    def __init__(self, max_concurrent=2, min_interval=1.0):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._domains = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def domain_of(url):
+        return (urlsplit(url).hostname or "").lower()
+
+    def _state(self, domain):
+        with self._lock:
+            state = self._domains.get(domain)
+            if state is None:
+                state = self._domains[domain] = _DomainState(self.max_concurrent)
+            return state
+
+    @contextmanager
+    def slot(self, url):
+        """Blocks until a request to the URL's domain is allowed, and holds the slot for the with-block."""
+        state = self._state(self.domain_of(url))
+        state.semaphore.acquire()
+        try:
+            with state.lock:
+                now = time.monotonic()
+                wait = state.next_allowed - now
+                state.next_allowed = max(now, state.next_allowed) + self.min_interval
+            if wait > 0:
+                time.sleep(wait)
+            yield
+        finally:
+            state.semaphore.release()
@@ -0,0 +1,69 @@
+# safeagree_backend/services/fetch_cache.py
+# Persistent, conditional-GET cache of fetched policy pages keyed on the policy URL.
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# source is one of: 'fresh' (served from cache without a request), 'revalidated'
+# (origin answered 304), 'fetched' (full fetch) or 'failed'.
+CachedFetch = namedtuple('CachedFetch', ['text', 'content_hash', 'not_modified', 'source'])
+
+
+class PolicyFetchCache:
+    """
+    Read-through cache in front of ScraperService for policy URLs.
+
+    Each entry stores the ETag, Last-Modified, content hash and extracted text of the
+    last successful fetch. Within fresh_ttl the cached text is served without any
+    request; after that the URL is revalidated with a conditional GET, and a 304
+    returns the cached hash so callers can skip extraction, hashing and summarization.
+    Entries are evicted LRU-first once max_entries or max_bytes is exceeded, and
+    dropped entirely when not validated for max_age.
+    """
+    def __init__(self, db_manager, scraper_service, hash_function,
+                 fresh_ttl=3600, max_age=30 * 24 * 3600, max_entries=5000, max_bytes=256 * 1024 * 1024):
+        self.db_manager = db_manager
+        self.scraper_service = scraper_service
+        self.hash_function = hash_function
+        self.fresh_ttl = timedelta(seconds=fresh_ttl)
+        self.max_age = timedelta(seconds=max_age)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def fetch(self, url, force_revalidate=False, max_staleness=None):
+        """
+        Returns the policy text behind `url`, revalidating the cached copy when needed.
+        :param url: The policy URL (Policy.original_link).
+        :param force_revalidate: Ask the origin even if the cached entry is still fresh.
+        :param max_staleness: Seconds a validated entry may be reused without asking the
+                              origin, overriding fresh_ttl for this call (0 always revalidates).
+        :return: CachedFetch. `not_modified` is True when the text is the one already cached.
+        """
+        fresh_window = self.fresh_ttl if max_staleness is None else timedelta(seconds=max_staleness)
+        if force_revalidate:
+            fresh_window = timedelta(0)
+        now = datetime.now()
+        entry = self.db_manager.get_fetch_cache_entry(url)
+        if entry is not None and now - entry.validated_at > self.max_age:
+            entry = None # Too old to trust its validators; refetch from scratch
+
+        if entry is not None and now - entry.validated_at < fresh_window:
+            self.db_manager.touch_fetch_cache_entry(url)
+            return CachedFetch(entry.extracted_text, entry.content_hash, True, 'fresh')
+
+        if entry is not None:
+            result = self.scraper_service.fetch_policy(url, etag=entry.etag, last_modified=entry.last_modified)
+        else:
+            result = self.scraper_service.fetch_policy(url)
+
+        if result.not_modified:
+            self.db_manager.touch_fetch_cache_entry(url, revalidated=True)
+            return CachedFetch(entry.extracted_text, entry.content_hash, True, 'revalidated')
+        if not result.text:
+            return CachedFetch(None, None, False, 'failed')
+
+        content_hash = str(self.hash_function(result.text))
+        self.db_manager.upsert_fetch_cache_entry(url, result.etag, result.last_modified, content_hash, result.text)
+        self.db_manager.evict_fetch_cache(self.max_entries, self.max_bytes, expired_before=now - self.max_age)
+        unchanged = entry is not None and entry.content_hash == content_hash
+        return CachedFetch(result.text, content_hash, unchanged, 'fetched')
@@ -1,63 +1,180 @@
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
 import PyPDF2
 from docx import Document
 
+logger = logging.getLogger(__name__)
+
+
+def _extract_pdf_page_range(pdf_bytes, start, end, deadline):
+    """
+    Extracts the text of pages [start, end) of a PDF. Runs in a worker process.
+    Stops early once `deadline` (a time.time() value) has passed.
+    :return: List of page texts, possibly shorter than end - start.
+    """
+    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
+    pages = []
+    for page_num in range(start, end):
+        if time.time() > deadline:
+            break
+        pages.append(pdf_reader.pages[page_num].extract_text() or "")
+    return pages
+
+
 class FileReaderService:
-    def __init__(self):
-        print("FileReaderService initialized.")
+    """
+    Extracts plain text from uploaded policy files (.txt, .pdf, .docx).
+
+    Extraction is bounded: uploads over max_bytes are rejected, PDFs are cut off after
+    max_pages, and extraction stops at time_limit seconds, keeping the text read so far.
+    PDFs with at least parallel_min_pages pages are split into page ranges that are
+    extracted across a shared process pool; smaller ones are streamed page by page.
+    """
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, max_bytes=20 * 1024 * 1024, max_pages=300, time_limit=30.0, parallel_min_pages=40, max_workers=4):
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.time_limit = time_limit
+        self.parallel_min_pages = parallel_min_pages
+        self.max_workers = max_workers
+        logger.info("FileReaderService initialized.")
+
+    def _get_executor(self):
+        # One pool per process, shared by every FileReaderService instance
+        with FileReaderService._executor_lock:
+            if FileReaderService._executor is None:
+                FileReaderService._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return FileReaderService._executor
+
+    @staticmethod
+    def _as_bytes(file_content):
+        """Accepts raw bytes or a binary file object (e.g. a spooled upload)."""
+        if isinstance(file_content, (bytes, bytearray, memoryview)):
+            return bytes(file_content)
+        file_content.seek(0)
+        return file_content.read()
 
-    def _read_policy_file(self, file_content: bytes, file_extension: str = 'txt') -> str:
+    @staticmethod
+    def _content_size(file_content):
+        if isinstance(file_content, (bytes, bytearray, memoryview)):
+            return len(file_content)
+        position = file_content.tell()
+        file_content.seek(0, 2)
+        size = file_content.tell()
+        file_content.seek(position)
+        return size
+
+    def _iter_pdf_pages(self, pdf_reader, page_count, deadline):
+        """Yields page texts one at a time until page_count pages or the deadline."""
+        for page_num in range(page_count):
+            if time.time() > deadline:
+                logger.warning("PDF extraction hit the %ss time limit after %s pages.", self.time_limit, page_num)
+                return
+            yield pdf_reader.pages[page_num].extract_text() or ""
+
+    def _extract_pdf_parallel(self, pdf_bytes, page_count, deadline):
+        """Splits the pages into one range per worker and joins the results in order."""
+        range_size = -(-page_count // self.max_workers)
+        ranges = [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
+        executor = self._get_executor()
+        futures = [executor.submit(_extract_pdf_page_range, pdf_bytes, start, end, deadline) for start, end in ranges]
+        # Workers stop on their own at the deadline; the grace period covers the page in flight
+        done, not_done = wait(futures, timeout=max(deadline - time.time(), 0) + 5)
+        pages = []
+        for future in futures:
+            if future not in done:
+                future.cancel()
+                logger.warning("PDF extraction hit the time limit; keeping the pages extracted so far.")
+                break
+            range_pages = future.result()
+            pages.extend(range_pages)
+            if len(range_pages) < range_size and future is not futures[-1]:
+                break # A range cut short by the deadline; later ranges would leave a gap
+        return pages
+
+    def _extract_pdf(self, file_content, deadline):
+        # File objects (e.g. spooled uploads) are parsed in place rather than copied into memory
+        stream = file_content if hasattr(file_content, 'read') else BytesIO(file_content)
+        stream.seek(0)
+        pdf_reader = PyPDF2.PdfReader(stream)
+        page_count = len(pdf_reader.pages)
+        if page_count > self.max_pages:
+            logger.warning("PDF has %s pages; only the first %s are extracted.", page_count, self.max_pages)
+            page_count = self.max_pages
+
+        if page_count >= self.parallel_min_pages and self.max_workers > 1:
+            try:
+                pdf_bytes = self._as_bytes(file_content) # Worker processes each need their own copy
+                return "\n".join(self._extract_pdf_parallel(pdf_bytes, page_count, deadline))
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning("Parallel PDF extraction unavailable (%s); extracting sequentially.", e)
+        return "\n".join(self._iter_pdf_pages(pdf_reader, page_count, deadline))
+
+    def _extract_docx(self, file_content, deadline):
+        stream = file_content if hasattr(file_content, 'read') else BytesIO(file_content)
+        stream.seek(0)
+        document = Document(stream)
+        paragraphs = []
+        for paragraph in document.paragraphs:
+            if time.time() > deadline:
+                logger.warning("DOCX extraction hit the %ss time limit.", self.time_limit)
+                break
+            paragraphs.append(paragraph.text)
+        return "\n".join(paragraphs)
+
+    def _read_policy_file(self, file_content, file_extension: str = 'txt') -> str:
         """
         Reads policy text from uploaded file content.
         This function is designed to handle different file types (e.g., .txt, .pdf, .docx)
         by attempting to extract plain text.
 
         Args:
-            file_content: The raw byte content of the uploaded file.
+            file_content: The raw byte content of the uploaded file, or a binary file object.
             file_extension: The extension of the file (e.g., 'txt', 'pdf', 'docx').
                             Used to determine the appropriate parsing method.
 
         Returns:
             The extracted plain text content of the policy, or an empty string if extraction fails.
         """
-        print(f"Attempting to read text from uploaded file with extension: {file_extension}")
+        logger.debug("Attempting to read text from uploaded file with extension: %s", file_extension)
         extracted_text = ""
+        deadline = time.time() + self.time_limit
 
         try:
+            size = self._content_size(file_content)
+            if size > self.max_bytes:
+                logger.warning("Uploaded file is %s bytes, over the %s byte limit; not extracted.", size, self.max_bytes)
+                return ""
+
             if file_extension.lower() == 'txt':
                 # Assume UTF-8 encoding for text files
-                extracted_text = file_content.decode('utf-8')
-                print("Successfully read text from .txt file.")
-            # --- CONCEPTUAL IMPLEMENTATION FOR OTHER FILE TYPES (UNCOMMENT AND CONFIGURE) ---
+                extracted_text = self._as_bytes(file_content).decode('utf-8')
+                logger.debug("Successfully read text from .txt file.")
             elif file_extension.lower() == 'pdf':
-            # Requires PyPDF2
-                # Create a BytesIO object from the file_content to read it as a file
-                pdf_file = BytesIO(file_content)
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    extracted_text += page.extract_text() + "\n"
-                print("Successfully extracted text from .pdf file.")
+                extracted_text = self._extract_pdf(file_content, deadline)
+                logger.debug("Successfully extracted text from .pdf file.")
             elif file_extension.lower() == 'docx':
-            # Requires python-docx
-                # Create a BytesIO object from the file_content
-                doc_file = BytesIO(file_content)
-                document = Document(doc_file)
-                for paragraph in document.paragraphs:
-                    extracted_text += paragraph.text + "\n"
-                print("Successfully extracted text from .docx file.")
+                extracted_text = self._extract_docx(file_content, deadline)
+                logger.debug("Successfully extracted text from .docx file.")
             else:
-                print(f"Unsupported file type for reading: {file_extension}. Attempting to decode as UTF-8.")
+                logger.info("Unsupported file type for reading: %s. Attempting to decode as UTF-8.", file_extension)
                 # Fallback for unknown types, try to decode as plain text
+                raw = self._as_bytes(file_content)
                 try:
-                    extracted_text = file_content.decode('utf-8')
+                    extracted_text = raw.decode('utf-8')
                 except UnicodeDecodeError:
-                    print("Could not decode file content as UTF-8. Trying latin-1.")
-                    extracted_text = file_content.decode('latin-1') # Another common fallback
-                print("Attempted to read as plain text.")
+                    logger.info("Could not decode file content as UTF-8. Trying latin-1.")
+                    extracted_text = raw.decode('latin-1') # Another common fallback
+                logger.debug("Attempted to read as plain text.")
 
         except Exception as e:
-            print(f"Error reading file content for extension {file_extension}: {e}")
+            logger.exception("Error reading file content for extension %s: %s", file_extension, e)
             extracted_text = "" # Return empty string on error
 
         return extracted_text.strip() # Strip leading/trailing whitespace from final text
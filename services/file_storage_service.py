@@ -1,90 +1,204 @@
 # safeagree_backend/services/file_storage_service.py
 # Manages interactions with file storage (e.g., AWS S3 or local file system).
-import boto3
 import json
+import logging
 import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 
+from services.storage_backends import build_storage_backend
+from services.summary_codec import (encode_summary, decode_summary, decode_summary_bytes, summary_format_version,
+                                    SUMMARY_FORMAT_VERSION)
+
+logger = logging.getLogger(__name__)
+
 # AWS S3 configuration from environment variables
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "safeagree")
 AWS_REGION = os.getenv("AWS_REGION", "eu-north-1") # Example region
 
+# One entry of a batch read: data is None when the key is missing or failed, with the reason in error
+BatchGetResult = namedtuple('BatchGetResult', ['file_name', 'data', 'error'])
+
 class FilebaseManager:
     """
-    Manages file storage and retrieval from AWS S3.
+    Manages file storage and retrieval through a pluggable StorageBackend
+    (AWS S3 by default, or the local filesystem).
     """
-    def __init__(self,AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, S3_BUCKET_NAME, AWS_REGION):
-        if not all([AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, S3_BUCKET_NAME, AWS_REGION]):
-            print("WARNING: AWS S3 credentials or bucket name not fully configured. S3 operations will fail.")
-            self.s3_client = None
-        else:
-            self.s3_client = boto3.client(
-                's3',
-                aws_access_key_id=AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-                region_name=AWS_REGION
-            )
+    def __init__(self,AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, S3_BUCKET_NAME, AWS_REGION, summary_cache=None,
+                 storage_backend=None, max_concurrency=10, compress=True, compresslevel=6):
+        # Optional SummaryCache consulted before storage reads; summaries are immutable per key
+        self.summary_cache = summary_cache
+        # New summaries are written gzip-compressed (summary_codec v1); reads accept both formats
+        self.compress = compress
+        self.compresslevel = compresslevel
+        # Batch reads share one pool, sized like the S3 client's connection pool
+        self.max_concurrency = max_concurrency
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        if storage_backend is None:
+            storage_backend = build_storage_backend("s3", AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, S3_BUCKET_NAME, AWS_REGION,
+                                                    max_pool_connections=max_concurrency)
+        self.backend = storage_backend
+        if self.backend is None:
+            logger.warning("AWS S3 credentials or bucket name not fully configured. S3 operations will fail.")
 
     def upload_json_to_s3(self, file_name, json_data):
         """
-        Uploads a JSON object to an S3 bucket.
-        :param file_name: S3 object key (e.g., 'policy_summary_123.json')
+        Uploads a JSON object to the storage backend.
+        :param file_name: Object key (e.g., 'policy_summary_123.json')
         :param json_data: Python dictionary to be stored as JSON
         :return: True if upload successful, False otherwise
         """
-        if not self.s3_client:
-            print("S3 client not initialized. Cannot upload.")
+        if not self.backend:
+            logger.error("Storage backend not initialized. Cannot upload.")
             return False
         try:
-            json_string = json.dumps(json_data)
-            self.s3_client.put_object(Bucket=S3_BUCKET_NAME, Key=file_name, Body=json_string, ContentType='application/json')
-            print(f"Successfully uploaded {file_name} to S3 bucket {S3_BUCKET_NAME}")
+            if self.compress:
+                body, json_bytes = encode_summary(json_data, self.compresslevel)
+            else:
+                body = json_bytes = json.dumps(json_data).encode('utf-8')
+            if self.summary_cache is not None:
+                self.summary_cache.invalidate(file_name)
+            self.backend.put_bytes(file_name, body, content_type='application/json')
+            logger.debug("Successfully uploaded %s to %s storage (%s bytes)", file_name, self.backend.name, len(body))
+            if self.summary_cache is not None:
+                self.summary_cache.set(file_name, json_data, body, len(json_bytes))
             return True
         except ClientError as e:
-            print(f"Error uploading {file_name} to S3: {e}")
+            logger.error("Error uploading %s to S3: %s", file_name, e)
             return False
         except Exception as e:
-            print(f"An unexpected error occurred during S3 upload: {e}")
+            logger.exception("An unexpected error occurred during upload of %s: %s", file_name, e)
             return False
 
+    def _load_entry(self, file_name):
+        """
+        Reads and decodes one object, bypassing the cache lookup.
+        :return: Tuple (summary, stored_bytes), or None if the key does not exist. Other failures raise.
+        """
+        raw = self.backend.get_bytes(file_name)
+        if raw is None:
+            logger.info("File %s not found in %s storage.", file_name, self.backend.name)
+            return None
+        json_data, json_bytes = decode_summary(raw)
+        logger.debug("Successfully retrieved %s from %s storage", file_name, self.backend.name)
+        if self.summary_cache is not None:
+            self.summary_cache.set(file_name, json_data, raw, len(json_bytes))
+        return json_data, raw
+
+    def _load_json(self, file_name):
+        entry = self._load_entry(file_name)
+        return entry[0] if entry is not None else None
+
     def get_json_from_s3(self, file_name):
         """
-        Retrieves a JSON object from an S3 bucket.
-        :param file_name: S3 object key
+        Retrieves a JSON object from the storage backend.
+        :param file_name: Object key
         :return: Python dictionary if successful, None otherwise
         """
-        if not self.s3_client:
-            print("S3 client not initialized. Cannot retrieve.")
+        if self.summary_cache is not None:
+            cached = self.summary_cache.get(file_name)
+            if cached is not None:
+                return cached
+        if not self.backend:
+            logger.error("Storage backend not initialized. Cannot retrieve.")
             return None
         try:
-            response = self.s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=file_name)
-            json_data = json.loads(response['Body'].read().decode('utf-8'))
-            print(f"Successfully retrieved {file_name} from S3 bucket {S3_BUCKET_NAME}")
-            return json_data
+            return self._load_json(file_name)
         except ClientError as e:
-            if e.response['Error']['Code'] == 'NoSuchKey':
-                print(f"File {file_name} not found in S3.")
-            else:
-                print(f"Error retrieving {file_name} from S3: {e}")
+            logger.error("Error retrieving %s from S3: %s", file_name, e)
             return None
         except Exception as e:
-            print(f"An unexpected error occurred during S3 retrieval: {e}")
+            logger.exception("An unexpected error occurred during retrieval of %s: %s", file_name, e)
+            return None
+
+    def get_summary_payload(self, file_name, accept_gzip=False):
+        """
+        Returns a stored summary as response bytes, skipping JSON decode/encode where possible.
+        Compressed objects are passed through untouched to clients that accept gzip.
+        :param accept_gzip: Whether the client sent a matching Accept-Encoding.
+        :return: Tuple (body_bytes, content_encoding or None), or None if unavailable.
+        """
+        entry = self.summary_cache.get_entry(file_name) if self.summary_cache is not None else None
+        try:
+            if entry is None:
+                if not self.backend:
+                    logger.error("Storage backend not initialized. Cannot retrieve.")
+                    return None
+                entry = self._load_entry(file_name)
+                if entry is None:
+                    return None
+            raw = entry[1]
+            # Only the current format is known to be plain gzip-compressed JSON that clients can read as-is
+            if accept_gzip and summary_format_version(raw) == SUMMARY_FORMAT_VERSION:
+                return raw, 'gzip'
+            return decode_summary_bytes(raw), None
+        except Exception as e:
+            logger.exception("An unexpected error occurred during retrieval of %s: %s", file_name, e)
             return None
-        
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="storage-get")
+            return self._executor
+
+    def get_many_json(self, file_names):
+        """
+        Retrieves several JSON objects at once. Cache hits are answered inline and the
+        remaining keys are fetched concurrently, so the call costs about one round trip.
+        :param file_names: Object keys; duplicates are fetched once.
+        :return: List of BatchGetResult in the same order as file_names.
+        """
+        found = {}
+        errors = {}
+        pending = []
+        for file_name in dict.fromkeys(file_names):
+            cached = self.summary_cache.get(file_name) if self.summary_cache is not None else None
+            if cached is not None:
+                found[file_name] = cached
+            elif not self.backend:
+                errors[file_name] = "Storage backend not initialized."
+            else:
+                pending.append(file_name)
+
+        if len(pending) <= 1:
+            futures = None
+        else:
+            executor = self._get_executor()
+            futures = {file_name: executor.submit(self._load_json, file_name) for file_name in pending}
+        for file_name in pending:
+            try:
+                data = futures[file_name].result() if futures else self._load_json(file_name)
+            except Exception as e:
+                logger.error("Error retrieving %s in batch: %s", file_name, e)
+                errors[file_name] = str(e)
+                continue
+            if data is None:
+                errors[file_name] = "Not found."
+            else:
+                found[file_name] = data
+
+        return [BatchGetResult(file_name, found.get(file_name), errors.get(file_name)) for file_name in file_names]
+
     def delete_file_from_s3(self, file_name):
-        """Deletes a file from S3."""
-        if not self.s3:
-            print("S3 client not initialized. Cannot delete.")
+        """Deletes a file from the storage backend."""
+        if not self.backend:
+            logger.error("Storage backend not initialized. Cannot delete.")
             return False
         try:
-            self.s3.delete_object(Bucket=self.s3_bucket_name, Key=file_name)
-            print(f"Successfully deleted {file_name} from S3.")
+            if self.summary_cache is not None:
+                self.summary_cache.invalidate(file_name)
+            self.backend.delete(file_name)
+            logger.debug("Successfully deleted %s from %s storage.", file_name, self.backend.name)
             return True
         except ClientError as e:
-            print(f"Error deleting {file_name} from S3: {e}")
+            logger.error("Error deleting %s from S3: %s", file_name, e)
             return False
         except Exception as e:
-            print(f"An unexpected error occurred during S3 deletion: {e}")
-            return False
\ No newline at end of file
+            logger.exception("An unexpected error occurred during deletion of %s: %s", file_name, e)
+            return False
@@ -0,0 +1,152 @@
+# safeagree_backend/services/job_queue.py
+# Runs policy summarization in the background so HTTP workers only enqueue work.
+# Job state lives in the 'policy_jobs' table, so any gunicorn worker can answer
+# a status poll and no external broker is needed.
+
+import json
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from utils.upload_spool import SpooledUpload
+from utils.structured_logging import get_request_id, set_request_id
+
+logger = logging.getLogger(__name__)
+
+# Job statuses
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# Final stage of a finished job (the other stages come from Communicator.process_policy)
+STAGE_DONE = "done"
+
+# Communicator owned by a process-pool worker (built once by _init_process_worker)
+_worker_communicator = None
+
+
+def _init_process_worker(communicator_factory):
+    """ProcessPoolExecutor initializer: builds this worker process's own Communicator."""
+    global _worker_communicator
+    _worker_communicator = communicator_factory()
+
+
+def _run_in_process(job_id, payload):
+    run_summarize_job(_worker_communicator, job_id, payload)
+
+
+def run_summarize_job(communicator, job_id, payload):
+    """
+    Executes one summarization job and records its progress and outcome.
+    :param communicator: Communicator used to process the policy.
+    :param job_id: ID of the PolicyJob row to update.
+    :param payload: Dict with policy_input, input_type, company_name, processing_date, file_extension
+                    and the request_id of the submitting request (so the job's log records carry it).
+    """
+    set_request_id(payload.get("request_id"))
+    db_manager = communicator.db_manager
+    db_manager.update_job(job_id, status=JOB_RUNNING)
+
+    def progress(stage):
+        db_manager.update_job(job_id, stage=stage)
+
+    try:
+        policy_obj, summary_data = communicator.process_policy(
+            payload["policy_input"], payload["input_type"], payload["company_name"],
+            payload["processing_date"], payload.get("file_extension"), progress=progress
+        )
+    except Exception as e:
+        logger.exception("Job %s crashed: %s", job_id, e, extra={"job_id": job_id})
+        db_manager.update_job(job_id, status=JOB_FAILED, error=f"Unexpected error: {e}")
+        return
+    finally:
+        if isinstance(payload["policy_input"], SpooledUpload):
+            payload["policy_input"].cleanup() # Spooled uploads are owned by their job
+
+    if policy_obj and summary_data:
+        result = {
+            "policy_id": policy_obj.id,
+            "original_link": policy_obj.original_link if policy_obj.original_link else None,
+            "company_name": policy_obj.company_name,
+            "summary": summary_data,
+        }
+        db_manager.update_job(job_id, status=JOB_SUCCEEDED, stage=STAGE_DONE, policy_id=policy_obj.id,
+                              result=json.dumps(result))
+    else:
+        db_manager.update_job(job_id, status=JOB_FAILED, error=summary_data or "Failed to process policy.")
+
+
+class JobQueue:
+    """
+    In-process background job queue for policy summarization.
+
+    Jobs run on a thread pool (default) or a process pool. In process mode each
+    worker process builds its own Communicator with `communicator_factory`, which
+    must be a picklable module-level callable.
+    """
+    def __init__(self, communicator, executor_type="thread", max_workers=4, communicator_factory=None):
+        if executor_type not in ("thread", "process"):
+            raise ValueError("executor_type must be 'thread' or 'process'.")
+        if executor_type == "process" and communicator_factory is None:
+            raise ValueError("A communicator_factory is required for the process executor.")
+        self.communicator = communicator
+        self.db_manager = communicator.db_manager
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.communicator_factory = communicator_factory
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """Creates the pool on first use, so it is never created before gunicorn forks."""
+        with self._lock:
+            if self._executor is None:
+                if self.executor_type == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                         initializer=_init_process_worker,
+                                                         initargs=(self.communicator_factory,))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="policy-job")
+            return self._executor
+
+    def submit_summarize(self, policy_input, input_type, company_name, processing_date, file_extension=None):
+        """
+        Queues a policy for summarization.
+        :return: The job ID, or None if the job could not be recorded.
+        """
+        job_id = str(uuid.uuid4())
+        if not self.db_manager.add_job(job_id, input_type, company_name):
+            return None
+        payload = {
+            "policy_input": policy_input,
+            "input_type": input_type,
+            "company_name": company_name,
+            "processing_date": processing_date,
+            "file_extension": file_extension,
+            "request_id": get_request_id(),
+        }
+        try:
+            if self.executor_type == "process":
+                self._get_executor().submit(_run_in_process, job_id, payload)
+            else:
+                self._get_executor().submit(run_summarize_job, self.communicator, job_id, payload)
+        except RuntimeError as e: # Executor already shut down
+            self.db_manager.update_job(job_id, status=JOB_FAILED, error=f"Job queue unavailable: {e}")
+            if isinstance(policy_input, SpooledUpload):
+                policy_input.cleanup()
+        logger.info("Queued %s summarization job %s.", input_type, job_id, extra={"job_id": job_id})
+        return job_id
+
+    def get_job(self, job_id):
+        """Returns the serialized state of a job, or None if it does not exist."""
+        job = self.db_manager.get_job(job_id)
+        return job.serialize() if job else None
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
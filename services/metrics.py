@@ -0,0 +1,150 @@
+# safeagree_backend/services/metrics.py
+# In-process instrumentation: span timings of the policy processing stages, SQL
+# statement counts and timings (via SQLAlchemy events) and HTTP request latency,
+# aggregated into histograms and rendered in the Prometheus text format for /metrics.
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# Seconds; spans from a cached DB lookup (~1 ms) up to a slow summarizer run
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Statements per HTTP request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SQL_VERBS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and three additions under a lock."""
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class _Family:
+    """One metric name with its help text, type and a child (counter value or Histogram) per label set."""
+    def __init__(self, name, kind, help_text, label_names, buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.children = {}
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters and histograms, keyed by metric name and label values.
+    Metrics are per process: with several gunicorn workers each one reports its own.
+    """
+    def __init__(self, prefix="safeagree"):
+        self.prefix = prefix
+        self._families = {}
+        self._lock = threading.Lock()
+        self._sql_timer = threading.local()
+        self.counter("sql_statements_total", "SQL statements executed, by statement type.", ("verb",))
+        self.histogram("sql_statement_duration_seconds", "SQL statement execution time.", ("verb",))
+        self.histogram("stage_duration_seconds", "Time spent in each policy processing stage.", ("stage",))
+        self.histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+        self.histogram("http_request_queries", "SQL statements run per HTTP request.", ("route",),
+                       buckets=QUERY_COUNT_BUCKETS)
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(name, "counter", help_text, label_names)
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(name, "histogram", help_text, label_names, buckets)
+
+    def _register(self, name, kind, help_text, label_names, buckets=None):
+        full_name = f"{self.prefix}_{name}"
+        with self._lock:
+            family = self._families.get(full_name)
+            if family is None:
+                family = self._families[full_name] = _Family(full_name, kind, help_text, tuple(label_names), buckets)
+            return family
+
+    def inc(self, name, labels=(), amount=1):
+        family = self._families[f"{self.prefix}_{name}"]
+        with self._lock:
+            family.children[labels] = family.children.get(labels, 0) + amount
+
+    def observe(self, name, labels, value):
+        family = self._families[f"{self.prefix}_{name}"]
+        with self._lock:
+            histogram = family.children.get(labels)
+            if histogram is None:
+                histogram = family.children[labels] = Histogram(family.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage):
+        """Times the enclosed block as one run of a processing stage (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_duration_seconds", (stage,), time.perf_counter() - started)
+
+    def instrument_engine(self, engine):
+        """Counts and times every SQL statement the engine executes."""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._sql_timer.started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(self._sql_timer, "started", None)
+        if started is None:
+            return
+        self._sql_timer.started = None
+        verb = statement.lstrip()[:6].upper()
+        if verb not in SQL_VERBS:
+            verb = "OTHER"
+        self.inc("sql_statements_total", (verb,))
+        self.observe("sql_statement_duration_seconds", (verb,), time.perf_counter() - started)
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for family in self._families.values():
+                lines.append(f"# HELP {family.name} {family.help_text}")
+                lines.append(f"# TYPE {family.name} {family.kind}")
+                for labels, child in sorted(family.children.items()):
+                    if family.kind == "counter":
+                        lines.append(f"{family.name}{_format_labels(family.label_names, labels)} {_format_value(child)}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(family.buckets + ("+Inf",), child.counts):
+                        cumulative += count
+                        le = f'le="{bound}"'
+                        lines.append(f"{family.name}_bucket{_format_labels(family.label_names, labels, le)} {cumulative}")
+                    lines.append(f"{family.name}_sum{_format_labels(family.label_names, labels)} {_format_value(child.total)}")
+                    lines.append(f"{family.name}_count{_format_labels(family.label_names, labels)} {child.count}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,212 @@
+# safeagree_backend/services/recrawl_scheduler.py
+# Background re-crawl of linked policies, so library refreshes find changes
+# already processed instead of crawling on the user's request.
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Lease key that elects one scheduler among all gunicorn workers per cycle
+SCHEDULER_LEASE_KEY = "scheduler:recrawl"
+
+
+class RateBudget:
+    """Token bucket: allows `rate_per_minute` takes per minute, with bursts up to `burst`."""
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, rate_per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        """Takes one token if available; never blocks."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait_time(self):
+        """Seconds until a token is available (0 if one is available now)."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                return 0.0
+            return (1 - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+
+class RecrawlScheduler:
+    """
+    Periodically re-crawls the distinct Policy.original_link values.
+
+    Each cycle picks links not checked for `min_age` seconds and orders them by
+    popularity (library entries pointing at the link) and staleness. Crawls are
+    paced against a global and a per-domain rate budget for the length of the
+    cycle (`interval` seconds): each crawl starts once both budgets have a token
+    and a worker is free, so over time the scheduler crawls at the configured
+    rates. Links still waiting when the cycle ends are picked again by the next
+    one. Changed content is summarized and recorded as a new version. Only one
+    worker process runs a given cycle (elected through a lease row).
+    """
+    def __init__(self, communicator, interval=900, min_age=24 * 3600, global_rate_per_minute=30,
+                 domain_rate_per_minute=2, max_workers=2):
+        self.communicator = communicator
+        self.db_manager = communicator.db_manager
+        self.interval = interval
+        self.min_age = min_age
+        self.max_workers = max_workers
+        self.global_budget = RateBudget(global_rate_per_minute)
+        self.domain_rate_per_minute = domain_rate_per_minute
+        self._domain_budgets = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def priority(popularity, last_checked, now):
+        """Higher is crawled first: staleness in hours, scaled by log-popularity."""
+        staleness_hours = max((now - last_checked).total_seconds() / 3600.0, 0.0)
+        return staleness_hours * (1.0 + math.log1p(popularity))
+
+    @staticmethod
+    def _domain(url):
+        return (urlsplit(url).hostname or "").lower()
+
+    def _domain_budget(self, domain):
+        budget = self._domain_budgets.get(domain)
+        if budget is None:
+            budget = self._domain_budgets[domain] = RateBudget(self.domain_rate_per_minute)
+        return budget
+
+    def _recrawl(self, policy):
+        report, replacement = self.communicator._refresh_policy(policy, max_staleness=0)
+        return report
+
+    def _next_crawl(self, queues):
+        """
+        Pops the highest-priority link whose domain has a token left.
+        :param queues: Dict domain -> deque of (priority, policy), each in descending priority.
+        :return: (policy, None), or (None, seconds until some domain has a token again).
+        """
+        best = None
+        for domain, queue in queues.items():
+            if best is None or queue[0][0] > queues[best][0][0]:
+                if self._domain_budget(domain).wait_time() == 0:
+                    best = domain
+        if best is None:
+            return None, min(self._domain_budget(domain).wait_time() for domain in queues)
+        self._domain_budget(best).try_take()
+        policy = queues[best].popleft()[1]
+        if not queues[best]:
+            del queues[best]
+        return policy, None
+
+    def _wait_for_budget(self, queues, deadline):
+        """Blocks until the global and a domain budget allow a crawl; returns its policy, or None at the deadline."""
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            wait = self.global_budget.wait_time()
+            if wait == 0:
+                policy, wait = self._next_crawl(queues)
+                if policy is not None:
+                    self.global_budget.try_take() # Only this thread takes global tokens
+                    return policy
+            self._stop.wait(min(wait, remaining))
+        return None
+
+    def _wait_for_worker(self, free_workers, deadline):
+        """Blocks until a crawl worker is free; False at the deadline or on stop()."""
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if free_workers.acquire(timeout=min(remaining, 1.0)):
+                return True
+        return False
+
+    def run_once(self, duration=None):
+        """
+        Runs one re-crawl cycle. Crawls start one at a time as a worker frees up and the
+        rate budgets allow, so the cycle takes up to `duration` seconds.
+        :param duration: Seconds during which new crawls may start (defaults to `interval`).
+        :return: Dict with counts of crawled, changed, failed and deferred links.
+        """
+        now = datetime.now()
+        deadline = time.monotonic() + (self.interval if duration is None else duration)
+        candidates = self.db_manager.get_recrawl_candidates(checked_before=now - timedelta(seconds=self.min_age))
+        queues = {}
+        for policy, popularity, last_checked in sorted(
+                candidates, key=lambda c: self.priority(c[1], c[2], now), reverse=True):
+            queues.setdefault(self._domain(policy.original_link), deque()).append(
+                (self.priority(popularity, last_checked, now), policy))
+
+        stats = {"crawled": 0, "changed": 0, "failed": 0, "deferred": 0}
+        stats_lock = threading.Lock()
+        free_workers = threading.Semaphore(self.max_workers)
+
+        def crawl(policy):
+            try:
+                status = self._recrawl(policy)["status"]
+            except Exception as e:
+                logger.exception("Recrawl of %s failed: %s", policy.original_link, e)
+                status = "error"
+            finally:
+                free_workers.release()
+            with stats_lock:
+                if status == "updated":
+                    stats["changed"] += 1
+                elif status == "error":
+                    stats["failed"] += 1
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="recrawl") as executor:
+            # Tokens are taken when a crawl can start, so budgets are not spent on crawls queued behind busy workers
+            while queues and self._wait_for_worker(free_workers, deadline):
+                policy = self._wait_for_budget(queues, deadline)
+                if policy is None:
+                    free_workers.release()
+                    break
+                stats["crawled"] += 1
+                executor.submit(crawl, policy)
+        stats["deferred"] = sum(len(queue) for queue in queues.values()) # Picked up again by the next cycle
+        logger.info("Recrawl cycle finished: %s", stats)
+        return stats
+
+    def _loop(self):
+        owner = self.communicator.single_flight.owner
+        next_cycle = time.monotonic() + self.interval
+        while not self._stop.wait(max(next_cycle - time.monotonic(), 0)):
+            # Cycles start every `interval` seconds; a cycle paces its crawls over that whole window.
+            next_cycle += self.interval
+            # Only the worker holding the lease crawls this cycle; it expires before the next one.
+            if not self.db_manager.acquire_lease(SCHEDULER_LEASE_KEY, owner, max(self.interval - 1, 1)):
+                continue
+            try:
+                self.run_once(duration=max(self.interval - 1, 1))
+            except Exception as e:
+                logger.exception("Recrawl cycle failed: %s", e)
+
+    def start(self):
+        """Starts the background scheduler thread (idempotent)."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="recrawl-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Recrawl scheduler started (every %ss).", self.interval)
+
+    def stop(self):
+        self._stop.set()
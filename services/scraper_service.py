@@ -1,91 +1,241 @@
 # safeagree_backend/services/scraper_service.py
 # Contains the web scraping logic for fetching policy text from URLs.
 
+import logging
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.firefox.service import Service
 from webdriver_manager.firefox import GeckoDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup # For parsing HTML content after scraping
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import threading
+from collections import namedtuple
 import time  # For sleep delays in scraping
 
+from services.browser_pool import build_firefox_options
+
+logger = logging.getLogger(__name__)
+
+# Tiers reported by fetch_policy_text
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+TIER_FAILED = "failed"
+TIER_NOT_MODIFIED = "not_modified" # Conditional request answered with 304
+
+FetchResult = namedtuple('FetchResult', ['text', 'tier', 'etag', 'last_modified', 'not_modified'])
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; SafeAgreeBot/1.0; +https://safeagree.app)"
+
 class ScraperService:
     """
     Service for scraping policy text from URLs.
+
+    fetch_policy_text() is tiered: it first tries a plain pooled HTTP GET and
+    only falls back to a headless browser when the page looks JavaScript-rendered.
+    When a BrowserPool is supplied, drivers are borrowed from it instead of
+    launching a fresh Firefox process per URL.
     """
-    def __init__(self):
-        print("ScraperService initialized.")
+    def __init__(self, browser_pool=None, http_timeout=10, http_pool_size=10,
+                 min_static_text_chars=500, user_agent=DEFAULT_USER_AGENT, domain_throttle=None):
+        self.browser_pool = browser_pool
+        self.domain_throttle = domain_throttle # Optional per-domain politeness limits
+        self.http_timeout = http_timeout
+        self.min_static_text_chars = min_static_text_chars
+        self.http_session = self._build_http_session(http_pool_size, user_agent)
+        self._tier_counts = {TIER_HTTP: 0, TIER_BROWSER: 0, TIER_FAILED: 0, TIER_NOT_MODIFIED: 0}
+        self._tier_lock = threading.Lock()
+        logger.info("ScraperService initialized.")
+
+    @staticmethod
+    def _build_http_session(pool_size, user_agent):
+        """Creates a keep-alive HTTP session shared by all fast-path fetches."""
+        session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "User-Agent": user_agent,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,text/plain;q=0.8,*/*;q=0.5",
+        })
+        return session
+
+    @staticmethod
+    def _launch_driver():
+        """Launches a one-off headless Firefox driver (used when no pool is configured)."""
+        # Automatically download and manage geckodriver for Firefox
+        service = Service(GeckoDriverManager().install())
+        return webdriver.Firefox(service=service, options=build_firefox_options())
+
+    @staticmethod
+    def _extract_text(page_source, parser='html.parser'):
+        """Extracts the policy text from rendered HTML."""
+        # Use BeautifulSoup to parse the HTML and extract relevant text
+        soup = BeautifulSoup(page_source, parser)
+        return ScraperService._extract_soup_text(soup)
+
+    @staticmethod
+    def _extract_soup_text(soup):
+        """Extracts the policy text from an already parsed document."""
+        # This is a heuristic; you might need more specific selectors for real policies
+        # Attempt to find common elements that contain policy text
+        # e.g., <div class="policy-content">, <article>, <main>, or just body
+        content_div = soup.find('div', class_='policy-content') or \
+                    soup.find('article') or \
+                    soup.find('main') or \
+                    soup.find('body')
+        if content_div:
+            return content_div.get_text(separator='\n', strip=True)
+        return ""
+
+    def _extract_static_text(self, url, response):
+        """
+        Fast path: extracts the policy text from a plain HTTP response.
+        :return: The extracted text, or None if the page needs a real browser to render.
+        """
+        content_type = response.headers.get('Content-Type', '').lower()
+        if content_type.startswith('text/plain'):
+            return response.text.strip() or None
+        if 'html' not in content_type:
+            logger.info("Fast path skipped for %s: unsupported content type '%s'.", url, content_type)
+            return None
+
+        soup = BeautifulSoup(response.content, 'lxml')
+        if soup.body is None:
+            return None
+        # Script, style and noscript bodies never count as policy text.
+        for tag in soup.body.find_all(['script', 'style', 'noscript', 'template']):
+            tag.decompose()
+        policy_text = self._extract_soup_text(soup)
+        # An almost empty body (SPA mount point, noscript shell) means the content is rendered client-side.
+        if len(policy_text) < self.min_static_text_chars:
+            logger.info("Page %s looks JavaScript-rendered (%s chars of static text).", url, len(policy_text))
+            return None
+        return policy_text
+
+    def _scrape_with_driver(self, driver, url):
+        """Loads `url` in an already running driver and returns the extracted text."""
+        driver.get(url)
+        logger.debug("Successfully navigated to %s", url)
+        # Wait for content to load (adjust as needed)
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
+
+        # Get the page source after dynamic content has loaded
+        policy_text = self._extract_text(driver.page_source)
+        if policy_text:
+            logger.debug("Extracted text using BeautifulSoup.")
+        else:
+            policy_text = driver.find_element(By.TAG_NAME, 'body').text
+            logger.debug("Extracted text from body tag (less precise).")
+
+        # Optional: Handle cookie consent banners if they_obstruct content
+        try:
+            accept_button = driver.find_element(By.ID, 'onetrust-accept-btn-handler')
+            accept_button.click()
+            time.sleep(2) # Give time for banner to disappear
+            # Re-scrape after dismissing banner
+            policy_text = self._extract_text(driver.page_source) or policy_text
+        except Exception as e:
+            logger.debug("No cookie banner or failed to dismiss: %s", e)
+        return policy_text
 
     def _scrape_policy_text(self, url):
         """
-        Detailed conceptual implementation of web scraping policy text from a URL using Selenium.
-        This function would require a running Selenium WebDriver and a compatible browser.
+        Scrapes policy text from a URL using Selenium (the browser tier of fetch_policy).
+        Uses a pooled driver when a BrowserPool is configured, otherwise launches
+        (and quits) a dedicated browser for this call.
         """
-        print(f"Attempting to scrape text from URL: {url}")
+        logger.info("Attempting to scrape text from URL: %s", url)
         policy_text = ""
-        # --- REAL SELENIUM IMPLEMENTATION (UNCOMMENT AND CONFIGURE) ---
         try:
-            # Setup Firefox options for headless browsing
-            options = webdriver.FirefoxOptions() # Changed to FirefoxOptions
-            options.add_argument('--headless')          # Run in headless mode (no UI)
-            options.add_argument('--no-sandbox')        # Required for some environments (e.g., Docker)
-            options.add_argument('--disable-dev-shm-usage') # Overcomes limited resource problems
-            options.add_argument('--disable-gpu')       # Recommended for headless mode
-            options.add_argument('--window-size=1920,1080') # Set a consistent window size
-
-            # Automatically download and manage geckodriver for Firefox
-            service = Service(GeckoDriverManager().install()) # Changed to GeckoDriverManager
-            driver = webdriver.Firefox(service=service, options=options) # Changed to Firefox
-
-            driver.get(url)
-            print(f"Successfully navigated to {url}")
-
-            # Wait for content to load (adjust as needed)
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
-
-            # Get the page source after dynamic content has loaded
-            page_source = driver.page_source
-
-            # Use BeautifulSoup to parse the HTML and extract relevant text
-            # This is a heuristic; you might need more specific selectors for real policies
-            soup = BeautifulSoup(page_source, 'html.parser')
-            # Attempt to find common elements that contain policy text
-            # e.g., <div class="policy-content">, <article>, <main>, or just body
-            content_div = soup.find('div', class_='policy-content') or \
-                        soup.find('article') or \
-                        soup.find('main') or \
-                        soup.find('body')
-
-            if content_div:
-                policy_text = content_div.get_text(separator='\n', strip=True)
-                print("Extracted text using BeautifulSoup.")
+            if self.browser_pool is not None:
+                with self.browser_pool.lease() as driver:
+                    policy_text = self._scrape_with_driver(driver, url)
             else:
-                policy_text = driver.find_element(By.TAG_NAME, 'body').text
-                print("Extracted text from body tag (less precise).")
-
-            # Optional: Handle cookie consent banners if they_obstruct content
-            try:
-                accept_button = driver.find_element(By.ID, 'onetrust-accept-btn-handler')
-                accept_button.click()
-                time.sleep(2) # Give time for banner to disappear
-                page_source = driver.page_source # Re-scrape after dismissing banner
-                soup = BeautifulSoup(page_source, 'html.parser')
-                # Re-extract text
-                content_div = soup.find('div', class_='policy-content') or soup.find('body')
-                if content_div:
-                    policy_text = content_div.get_text(separator='\n', strip=True)
-            except Exception as e:
-                print(f"No cookie banner or failed to dismiss: {e}")
-
+                driver = None
+                try:
+                    driver = self._launch_driver()
+                    policy_text = self._scrape_with_driver(driver, url)
+                finally:
+                    if driver:
+                        driver.quit() # Ensure the browser is closed
         except Exception as e:
-            print(f"Error during web scraping for {url}: {e}")
-        finally:
-            if 'driver' in locals() and driver:
-                driver.quit() # Ensure the browser is closed
+            logger.error("Error during web scraping for %s: %s", url, e)
 
         if not policy_text: # If real scraping failed or not implemented
-            print(f"Error scraping {url}.")
+            logger.error("Error scraping %s.", url)
+
+        return policy_text
+
+    def _record_tier(self, tier):
+        with self._tier_lock:
+            self._tier_counts[tier] += 1
+
+    def tier_stats(self):
+        """Returns how many URLs each tier served, plus the fast-path hit rate."""
+        with self._tier_lock:
+            counts = dict(self._tier_counts)
+        served = counts[TIER_HTTP] + counts[TIER_BROWSER]
+        counts["http_hit_rate"] = round(counts[TIER_HTTP] / served, 4) if served else None
+        return counts
+
+    def fetch_policy(self, url, etag=None, last_modified=None):
+        """
+        Fetches policy text from a URL, using the cheapest tier that works.
+        When validators from an earlier fetch are given, the HTTP request is
+        conditional and a 304 answer short-circuits all extraction.
+        :param url: The policy URL.
+        :param etag: ETag returned by a previous fetch of this URL, if any.
+        :param last_modified: Last-Modified value returned by a previous fetch, if any.
+        :return: FetchResult. On 304, `not_modified` is True and `text` is None.
+        """
+        if self.domain_throttle is None:
+            return self._fetch_policy(url, etag, last_modified)
+        with self.domain_throttle.slot(url):
+            return self._fetch_policy(url, etag, last_modified)
+
+    def _fetch_policy(self, url, etag, last_modified):
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        policy_text = None
+        new_etag = new_last_modified = None
+        try:
+            response = self.http_session.get(url, timeout=self.http_timeout, headers=headers)
+            if response.status_code == 304 and headers:
+                self._record_tier(TIER_NOT_MODIFIED)
+                logger.debug("Policy at %s not modified since last fetch.", url)
+                return FetchResult(None, TIER_NOT_MODIFIED, etag, last_modified, True)
+            response.raise_for_status()
+            policy_text = self._extract_static_text(url, response)
+            new_etag = response.headers.get('ETag')
+            new_last_modified = response.headers.get('Last-Modified')
+        except requests.RequestException as e:
+            logger.warning("Fast path failed for %s: %s. Falling back to browser.", url, e)
+
+        if policy_text:
+            tier = TIER_HTTP
+        else:
+            policy_text = self._scrape_policy_text(url)
+            tier = TIER_BROWSER if policy_text else TIER_FAILED
+            # Validators of a static shell say nothing about the browser-rendered text.
+            new_etag = new_last_modified = None
+        self._record_tier(tier)
+        logger.info("Policy text for %s served by the '%s' tier.", url, tier, extra={"tier": tier})
+        return FetchResult(policy_text, tier, new_etag, new_last_modified, False)
 
-        return policy_text
\ No newline at end of file
+    def fetch_policy_text(self, url):
+        """
+        Fetches policy text from a URL, using the cheapest tier that works.
+        :param url: The policy URL.
+        :return: Tuple (policy_text, tier) where tier is 'http', 'browser' or 'failed'.
+        """
+        result = self.fetch_policy(url)
+        return result.text, result.tier
@@ -0,0 +1,158 @@
+# safeagree_backend/services/segment_cache.py
+# Per-segment cache of summarizer annotations, so a new version of a policy only
+# sends its changed segments to the summarizer.
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def segment_key(segment, namespace):
+    """Hash of a segment with whitespace normalized; namespace separates summarizer versions."""
+    normalized = _WHITESPACE.sub(" ", segment).strip()
+    return hashlib.blake2b(f"{namespace}\x00{normalized}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+class SegmentCache:
+    """
+    Node-local SQLite store mapping segment hashes to their annotations.
+
+    Shared by all worker processes on the node (WAL mode); each thread uses its own
+    connection. Least recently used entries are evicted once max_entries is exceeded.
+    Keeps cumulative hit/miss counts and the reuse ratio of recent policies.
+    """
+    EVICT_EVERY = 500 # Puts between eviction checks
+
+    def __init__(self, path, max_entries=200000, namespace="v1", recent=50):
+        self.path = path
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.recent = deque(maxlen=recent) # Per-policy reuse reports, newest last
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS segment_annotations ("
+            "key TEXT PRIMARY KEY, annotations TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_segment_annotations_last_used ON segment_annotations (last_used)")
+        connection.commit()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            self._local.connection = connection
+        return connection
+
+    def keys_for(self, segments):
+        return [segment_key(segment, self.namespace) for segment in segments]
+
+    def get_many(self, keys):
+        """
+        Looks up several segments at once and marks the hits as recently used.
+        :return: Dict key -> annotations for the keys found.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        if not unique_keys:
+            return {}
+        found = {}
+        connection = self._connection()
+        try:
+            # SQLite allows 999 bound parameters per statement in older builds
+            for i in range(0, len(unique_keys), 900):
+                batch = unique_keys[i:i + 900]
+                placeholders = ",".join("?" * len(batch))
+                rows = connection.execute(
+                    f"SELECT key, annotations FROM segment_annotations WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update((key, json.loads(annotations)) for key, annotations in rows)
+            if found:
+                now = time.time()
+                connection.executemany("UPDATE segment_annotations SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                connection.commit()
+        except sqlite3.Error as e:
+            logger.error("Segment cache lookup failed: %s", e)
+            return {}
+        return found
+
+    def put_many(self, items):
+        """Stores (key, annotations) pairs."""
+        if not items:
+            return
+        now = time.time()
+        connection = self._connection()
+        try:
+            connection.executemany(
+                "INSERT OR REPLACE INTO segment_annotations (key, annotations, last_used) VALUES (?, ?, ?)",
+                [(key, json.dumps(annotations), now) for key, annotations in items]
+            )
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.error("Segment cache write failed: %s", e)
+            return
+        with self._lock:
+            self._puts_since_evict += len(items)
+            due = self._puts_since_evict >= self.EVICT_EVERY
+            if due:
+                self._puts_since_evict = 0
+        if due:
+            self._evict()
+
+    def _evict(self):
+        """Deletes the least recently used entries down to 90% of max_entries."""
+        connection = self._connection()
+        try:
+            count = connection.execute("SELECT COUNT(*) FROM segment_annotations").fetchone()[0]
+            if count <= self.max_entries:
+                return
+            excess = count - int(self.max_entries * 0.9)
+            connection.execute(
+                "DELETE FROM segment_annotations WHERE key IN "
+                "(SELECT key FROM segment_annotations ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            connection.commit()
+            logger.info("Segment cache evicted %s entries.", excess)
+        except sqlite3.Error as e:
+            logger.error("Segment cache eviction failed: %s", e)
+
+    def record(self, policy_hash, segments, reused):
+        """Records the reuse of one processed policy and returns its report."""
+        report = {
+            "policy_hash": policy_hash,
+            "segments": segments,
+            "reused": reused,
+            "reuse_ratio": round(reused / segments, 4) if segments else 0.0,
+        }
+        with self._lock:
+            self.hits += reused
+            self.misses += segments - reused
+            self.recent.append(report)
+        return report
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reuse_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "recent_policies": list(self.recent),
+            }
@@ -0,0 +1,120 @@
+# safeagree_backend/services/segmentation.py
+# Splits policy text into OPP-115 style segments: paragraphs, with list items
+# (numbered or bulleted lines) broken out as segments of their own.
+
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+# One scanner for the whole document. Every match starts at a newline, which lets the
+# regex engine skip straight between line starts: either a paragraph break (a blank
+# line; the second newline is left for the next match) or a list item line
+# ("1. ...", "2) ...", "- ...", "* ...", "• ...").
+_ITEM = r'[ \t]*(?P<item>(?:\d+[.)]|[*•-])[ \t]+[^\n]*)'
+_SCANNER = re.compile(r'\n(?:(?P<brk>[ \t\r]*(?=\n))|' + _ITEM + ')')
+_FIRST_ITEM = re.compile(_ITEM) # A list item on the very first line has no newline before it
+# Bounds of a span without its leading/trailing whitespace
+_TRIMMED = re.compile(r'\S(?:.*\S)?', re.DOTALL)
+
+# Batches with less text than this are segmented in-process; worker start-up costs more
+BATCH_PARALLEL_MIN_CHARS = 2 * 1024 * 1024
+
+
+class SegmentedText:
+    """
+    Segments of one document as (start, end) character offsets into the original text.
+    Offsets are kept in two unsigned 32-bit arrays; substrings are only made when a
+    segment is read.
+    """
+    __slots__ = ('text', 'starts', 'ends')
+
+    def __init__(self, text, starts, ends):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        return self.text[self.starts[index]:self.ends[index]]
+
+    def __iter__(self):
+        text = self.text
+        for start, end in zip(self.starts, self.ends):
+            yield text[start:end]
+
+    def offsets(self):
+        """Returns the segments as a list of (start, end) tuples."""
+        return list(zip(self.starts, self.ends))
+
+    def to_list(self):
+        return list(self)
+
+
+def _add_trimmed(text, start, end, starts, ends):
+    """Records text[start:end] minus surrounding whitespace, unless nothing is left."""
+    match = _TRIMMED.search(text, start, end)
+    if match:
+        starts.append(match.start())
+        ends.append(match.end())
+
+
+def segment_offsets(text):
+    """
+    Segments a policy in a single pass over the text.
+
+    Paragraphs are separated by blank lines. Inside a paragraph every list item line
+    is its own segment, and the text between items (e.g. the sentence introducing a
+    list) is a segment as well; segments keep their order in the document.
+    :param text: The policy text.
+    :return: SegmentedText.
+    """
+    # 'L' is only guaranteed 32 bits wide; 'I' is 32 bits on every supported platform
+    starts, ends = array('I'), array('I')
+    if not text:
+        return SegmentedText("", starts, ends)
+
+    position = 0
+    first = _FIRST_ITEM.match(text)
+    if first:
+        _add_trimmed(text, first.start('item'), first.end(), starts, ends)
+        position = first.end()
+    for match in _SCANNER.finditer(text, position):
+        if match.lastgroup == 'brk':
+            _add_trimmed(text, position, match.start(), starts, ends)
+            position = match.end()
+        else:
+            _add_trimmed(text, position, match.start('item'), starts, ends)
+            _add_trimmed(text, match.start('item'), match.end(), starts, ends)
+            position = match.end()
+    _add_trimmed(text, position, len(text), starts, ends)
+    return SegmentedText(text, starts, ends)
+
+
+def _segment_arrays(text):
+    """Process-pool entry point: returns only the offset arrays, so the text is not sent back."""
+    segmented = segment_offsets(text)
+    return segmented.starts, segmented.ends
+
+
+def segment_text(text):
+    """Segments a policy (see segment_offsets) and returns the segments as strings."""
+    return segment_offsets(text).to_list()
+
+
+def segment_batch(texts, max_workers=None):
+    """
+    Segments many documents at once. Large batches are spread over a process pool
+    (the scanner holds the GIL), small ones run in the calling process.
+    :param texts: Iterable of policy texts.
+    :param max_workers: Process count for large batches (default: CPU count).
+    :return: List of SegmentedText, in input order.
+    """
+    texts = list(texts)
+    if len(texts) < 2 or sum(len(text) for text in texts) < BATCH_PARALLEL_MIN_CHARS:
+        return [segment_offsets(text) for text in texts]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        chunksize = max(1, len(texts) // ((max_workers or 4) * 4))
+        results = executor.map(_segment_arrays, texts, chunksize=chunksize)
+        return [SegmentedText(text, starts, ends) for text, (starts, ends) in zip(texts, results)]
@@ -0,0 +1,177 @@
+# safeagree_backend/services/similarity_index.py
+# Near-duplicate detection for policies: MinHash signatures over segment shingles,
+# looked up through locality-sensitive hashing (LSH) bands.
+
+import hashlib
+import random
+import re
+import threading
+from array import array
+from datetime import timedelta
+
+from services.segmentation import segment_text
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 61) - 1
+_WHITESPACE = re.compile(r"\s+")
+# Refreshes re-read signatures written this long before the newest one already loaded, so rows
+# committed out of order by other workers (or stamped by a skewed clock) are not skipped
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def segment_shingles(segments):
+    """
+    Hashes each segment to a 61-bit shingle. Case and whitespace are normalized so
+    reflowed or restyled text keeps its shingle. Digits are kept: "30 days" and
+    "90 days" must stay different; a changed date only changes its own segment.
+    """
+    shingles = set()
+    for segment in segments:
+        normalized = _WHITESPACE.sub(" ", segment).strip().lower()
+        if normalized:
+            digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+            shingles.add(int.from_bytes(digest, 'big') & _MAX_HASH)
+    return shingles
+
+
+def segment_set_hash(shingles):
+    """Exact fingerprint of a shingle set: BLAKE2b over the sorted shingles (MinHash only estimates equality)."""
+    packed = array('Q', sorted(shingles)).tobytes()
+    return hashlib.blake2b(packed, digest_size=32).hexdigest()
+
+
+class MinHasher:
+    """Computes num_perm-value MinHash signatures with universal hashing (a*x + b mod p)."""
+    def __init__(self, num_perm=64, seed=1):
+        self.num_perm = num_perm
+        rng = random.Random(seed) # Fixed seed: signatures must stay comparable across processes and restarts
+        self.permutations = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                             for _ in range(num_perm)]
+
+    def signature(self, shingles):
+        """:return: array('Q') of num_perm minimums (all _MAX_HASH for an empty set)."""
+        if not shingles:
+            return array('Q', [_MAX_HASH] * self.num_perm)
+        values = list(shingles)
+        return array('Q', [min([(a * x + b) % _MERSENNE_PRIME for x in values]) for a, b in self.permutations])
+
+
+class SimilarityIndex:
+    """
+    In-memory MinHash LSH index over the stored policy signatures.
+
+    Signatures are kept in one contiguous array('Q') (num_perm values per row) with
+    the policy ids in a parallel array; LSH buckets map (band, band values) to rows.
+    Candidates from the buckets are ranked by estimated Jaccard similarity of their
+    segment sets. The index loads lazily from the policy_signatures table and picks
+    up signatures written since its last refresh (new policies from other workers,
+    or a `flask rebuild-similarity-index` backfill) on each query.
+    """
+    def __init__(self, db_manager, num_perm=64, bands=16, threshold=0.8):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.db_manager = db_manager
+        self.hasher = MinHasher(num_perm)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.threshold = threshold
+        self._ids = array('q')
+        self._signatures = array('Q')
+        self._row_of = {}
+        self._buckets = {}
+        self._loaded_until = None # Write time of the newest signature loaded from the database
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def signature_for_segments(self, segments):
+        return self.hasher.signature(segment_shingles(segments))
+
+    def fingerprint_segments(self, segments):
+        """:return: Tuple (MinHash signature, exact segment-set hash)."""
+        shingles = segment_shingles(segments)
+        return self.hasher.signature(shingles), segment_set_hash(shingles)
+
+    def signature_for_text(self, text):
+        return self.signature_for_segments(segment_text(text))
+
+    def _band_keys(self, signature):
+        r = self.rows_per_band
+        return [(band, tuple(signature[band * r:(band + 1) * r])) for band in range(self.bands)]
+
+    def _add_row(self, policy_id, signature):
+        row = self._row_of.get(policy_id)
+        if row is None:
+            row = len(self._ids)
+            self._ids.append(policy_id)
+            self._signatures.extend(signature)
+            self._row_of[policy_id] = row
+        elif self._signatures[row * self.num_perm:(row + 1) * self.num_perm] == signature:
+            return # Already indexed (e.g. re-read within REFRESH_OVERLAP)
+        else:
+            # Re-indexed policy: overwrite in place; stale bucket entries only add candidates,
+            # which are ranked against the current signature
+            self._signatures[row * self.num_perm:(row + 1) * self.num_perm] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(row)
+
+    def _refresh(self):
+        """Loads signatures written since the last refresh (by this or any other worker)."""
+        since = None if self._loaded_until is None else self._loaded_until - REFRESH_OVERLAP
+        for policy_id, signature_bytes, written_at in self.db_manager.get_policy_signatures(self.num_perm, since):
+            signature = array('Q')
+            signature.frombytes(signature_bytes)
+            self._add_row(policy_id, signature)
+            if self._loaded_until is None or written_at > self._loaded_until:
+                self._loaded_until = written_at
+        self._loaded = True
+
+    def add(self, policy_id, signature, segment_count, set_hash=None):
+        """Stores a policy's signature (and exact segment-set hash) and indexes it."""
+        self.db_manager.upsert_policy_signature(policy_id, signature.tobytes(), self.num_perm, segment_count, set_hash)
+        with self._lock:
+            self._add_row(policy_id, signature)
+
+    def query(self, signature, threshold=None, limit=5, exclude_id=None):
+        """
+        Finds indexed policies whose estimated similarity to `signature` is at least `threshold`.
+        :return: List of (policy_id, similarity), most similar first.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            self._refresh()
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            matches = []
+            n = self.num_perm
+            for row in candidates:
+                policy_id = self._ids[row]
+                if policy_id == exclude_id:
+                    continue
+                other = self._signatures[row * n:(row + 1) * n]
+                similarity = sum(1 for x, y in zip(signature, other) if x == y) / n
+                if similarity >= threshold:
+                    matches.append((policy_id, similarity))
+        matches.sort(key=lambda match: (-match[1], -match[0]))
+        return matches[:limit]
+
+    def has_segment_set(self, policy_id, set_hash):
+        """True if the stored segment set of policy_id is exactly the one hashed to set_hash."""
+        row = self.db_manager.get_policy_signature(policy_id)
+        return row is not None and row.segment_set_hash is not None and row.segment_set_hash == set_hash
+
+    def reset(self):
+        """Drops the in-memory index; it reloads from the database on the next query."""
+        with self._lock:
+            self._ids = array('q')
+            self._signatures = array('Q')
+            self._row_of = {}
+            self._buckets = {}
+            self._loaded_until = None
+            self._loaded = False
+
+    def stats(self):
+        with self._lock:
+            return {"policies": len(self._ids), "buckets": len(self._buckets), "num_perm": self.num_perm,
+                    "bands": self.bands, "threshold": self.threshold}
@@ -0,0 +1,120 @@
+# safeagree_backend/services/single_flight.py
+# Collapses concurrent identical work (same policy URL or same content hash) into
+# a single in-flight computation whose result every caller shares.
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Stage reported while a leader waits for another process to release the key's lease
+STAGE_WAITING = "waiting"
+
+
+class _Flight:
+    """One in-flight computation and the outcome (and progress) its waiters will share."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.stage = None # Last stage reported by the leader
+        self.listeners = [] # Progress callbacks of the leader and its waiters
+        self.lock = threading.Lock()
+
+    def join(self, progress):
+        """Subscribes a progress callback and replays the current stage to it."""
+        with self.lock:
+            self.listeners.append(progress)
+            stage = self.stage
+        if stage is not None:
+            progress(stage)
+
+    def report(self, stage):
+        """Forwards a stage of the leader's computation to every caller sharing it."""
+        with self.lock:
+            self.stage = stage
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(stage)
+            except Exception as e:
+                logger.warning("Progress callback failed for stage %s: %s", stage, e)
+
+
+class SingleFlight:
+    """
+    Single-flight deduplication keyed on arbitrary strings.
+
+    Within one process, concurrent callers of do() with the same key wait for the
+    first caller (the leader) and receive its result or exception. Across processes
+    (e.g. gunicorn workers), leaders additionally hold a lease row in the database;
+    a leader that finds the lease taken waits for it to be released and then runs
+    its function itself, which by then is cheap because the other worker has
+    already stored the result.
+    """
+    def __init__(self, db_manager=None, lease_ttl=300, poll_interval=0.5):
+        self.db_manager = db_manager # None disables the cross-process lease
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, progress=None):
+        """
+        Runs fn(report) once per key among concurrent callers and returns its result.
+        :param key: Deduplication key, e.g. 'url:<normalized url>' or 'hash:<policy hash>'.
+        :param fn: Callable doing the actual work. Its one argument is a callback taking a stage
+                   name, forwarded to the progress callback of the leader and of every waiter.
+        :param progress: Optional callable receiving stage names. A waiter gets the leader's
+                         current stage when it joins and every stage reported afterwards.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+
+        if progress is not None:
+            flight.join(progress)
+        if not is_leader:
+            logger.debug("Joining in-flight computation for %s.", key)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._run_with_lease(key, lambda: fn(flight.report), flight)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _run_with_lease(self, key, fn, flight):
+        """Runs fn() while holding the cross-process lease for key."""
+        if self.db_manager is None:
+            return fn()
+
+        deadline = time.monotonic() + self.lease_ttl
+        waiting = False
+        while not self.db_manager.acquire_lease(key, self.owner, self.lease_ttl):
+            if not waiting:
+                flight.report(STAGE_WAITING) # Another worker runs the same key
+                waiting = True
+            if time.monotonic() > deadline:
+                logger.warning("Gave up waiting for the lease on %s; running without it.", key)
+                return fn()
+            time.sleep(self.poll_interval)
+        try:
+            return fn()
+        finally:
+            self.db_manager.release_lease(key, self.owner)
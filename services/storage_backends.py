@@ -0,0 +1,143 @@
+# safeagree_backend/services/storage_backends.py
+# Byte-level storage backends behind FilebaseManager: AWS S3 or the local filesystem.
+
+import hashlib
+import os
+import tempfile
+from urllib.parse import quote
+
+import boto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+
+
+class StorageBackend:
+    """
+    Contract shared by all backends. Keys are flat object names such as
+    'policy_summary_<hash>.json'. get_bytes returns None when the key does not exist;
+    any other failure raises.
+    """
+    name = "base"
+
+    def put_bytes(self, key, data, content_type='application/octet-stream'):
+        raise NotImplementedError
+
+    def get_bytes(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def exists(self, key):
+        return self.get_bytes(key) is not None
+
+
+class S3StorageBackend(StorageBackend):
+    """Stores objects in an S3 (or S3-compatible) bucket."""
+    name = "s3"
+
+    def __init__(self, access_key_id, secret_access_key, bucket_name, region, client=None, max_pool_connections=10):
+        self.bucket_name = bucket_name
+        # boto3 clients are thread-safe; the connection pool must be as large as the
+        # number of threads issuing concurrent requests or they queue for a socket.
+        self.client = client or boto3.client(
+            's3',
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            region_name=region,
+            config=BotoConfig(max_pool_connections=max_pool_connections)
+        )
+
+    def put_bytes(self, key, data, content_type='application/octet-stream'):
+        self.client.put_object(Bucket=self.bucket_name, Key=key, Body=data, ContentType=content_type)
+
+    def get_bytes(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return None
+            raise
+        return response['Body'].read()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket_name, Key=key)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket_name, Key=key)
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return False
+            raise
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Stores objects as files under `root`, sharded into two directory levels by the
+    SHA-1 of the key so no directory grows past a few thousand entries.
+    Writes go to a temp file in the target directory and are renamed into place,
+    so readers never see a partial object. Reads are a single buffered read of
+    the whole file: callers need the object as bytes, so mapping it saves no copy.
+    """
+    name = "local"
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        # quote() keeps the original name readable while ruling out path traversal
+        file_name = quote(key, safe='')
+        if file_name in ('', '.', '..'):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return os.path.join(self.root, digest[:2], digest[2:4], file_name)
+
+    def put_bytes(self, key, data, content_type='application/octet-stream'):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_bytes(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+
+def build_storage_backend(backend_name, access_key_id=None, secret_access_key=None, bucket_name=None,
+                          region=None, local_root=None, max_pool_connections=10):
+    """
+    Creates the backend selected in Config.
+    :return: A StorageBackend, or None when S3 is selected but not configured.
+    """
+    if backend_name == "local":
+        return LocalStorageBackend(local_root)
+    if backend_name != "s3":
+        raise ValueError(f"Unknown storage backend: {backend_name}")
+    if not all([access_key_id, secret_access_key, bucket_name, region]):
+        return None
+    return S3StorageBackend(access_key_id, secret_access_key, bucket_name, region, max_pool_connections=max_pool_connections)
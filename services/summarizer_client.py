@@ -0,0 +1,149 @@
+# safeagree_backend/services/summarizer_client.py
+# HTTP client for the summarizer AI service.
+#
+# Protocol: POST {"chunks": [{"id": <int>, "segments": [<text>, ...]}, ...]}
+# answered with {"results": [{"id": <int>, "segments": [<annotation>, ...]}, ...]},
+# one annotation per segment, in order. An annotation is a dict such as
+# {"category": "Data Sharing", "summary": "...", "key_point": "...", "sentiment": "Negative"};
+# "key_point" (optional) is the text of a point worth highlighting, collected into the summary's key_points.
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Rough sub-word token count: words and punctuation marks each count as one token
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+class SummarizerError(Exception):
+    """Raised when the summarizer service cannot produce annotations for a policy."""
+
+
+def estimate_tokens(text):
+    """Approximates the token count of `text` for chunk budgeting."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def _split_oversized(segment, token_budget):
+    """Splits one segment longer than the budget at sentence, then word, boundaries."""
+    pieces = []
+    current, current_tokens = [], 0
+    for sentence in _SENTENCE_END.split(segment):
+        sentence_tokens = estimate_tokens(sentence)
+        if sentence_tokens > token_budget:
+            words = sentence.split()
+            step = max(1, len(words) * token_budget // max(sentence_tokens, 1))
+            sentence_parts = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        else:
+            sentence_parts = [sentence]
+        for part in sentence_parts:
+            part_tokens = estimate_tokens(part)
+            if current and current_tokens + part_tokens > token_budget:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def build_chunks(segments, token_budget):
+    """
+    Packs consecutive segments into chunks of at most `token_budget` tokens.
+    :return: List of chunks; each chunk is a list of (segment_index, text) pairs. A segment
+             over the budget is split into several pieces sharing its segment_index.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+    for index, segment in enumerate(segments):
+        tokens = estimate_tokens(segment)
+        pieces = [segment] if tokens <= token_budget else _split_oversized(segment, token_budget)
+        for piece in pieces:
+            piece_tokens = tokens if len(pieces) == 1 else estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > token_budget:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append((index, piece))
+            current_tokens += piece_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class SummarizerClient:
+    """
+    Sends segmented policies to the summarizer service.
+
+    Segments are packed into token-budgeted chunks; `batch_size` chunks go in one
+    request and up to `max_concurrency` requests are in flight at once across all
+    policies using this client (one per worker process), over a pooled keep-alive session. Connection errors and 429/5xx answers are retried with
+    exponential backoff.
+    """
+    def __init__(self, endpoint, token_budget=1500, batch_size=4, max_concurrency=4,
+                 connect_timeout=5, read_timeout=120, retries=3, backoff_factor=0.5):
+        self.endpoint = endpoint
+        self.token_budget = token_budget
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(["POST"]), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="summarizer")
+            return self._executor
+
+    def _post_batch(self, batch):
+        """
+        Sends one request for a batch of (chunk_id, chunk) pairs.
+        :return: Dict chunk_id -> list of annotations.
+        """
+        payload = {"chunks": [{"id": chunk_id, "segments": [text for index, text in chunk]} for chunk_id, chunk in batch]}
+        try:
+            response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            results = response.json()["results"]
+        except (requests.RequestException, ValueError, KeyError) as e:
+            raise SummarizerError(f"Summarizer request failed: {e}") from e
+        return {result["id"]: result["segments"] for result in results}
+
+    def annotate(self, segments):
+        """
+        Annotates every segment of a policy.
+        :param segments: List of segment texts.
+        :return: List with one annotation list per input segment (several when a long
+                 segment had to be split across chunks).
+        """
+        if not segments:
+            return []
+        chunks = build_chunks(segments, self.token_budget)
+        numbered = list(enumerate(chunks))
+        batches = [numbered[i:i + self.batch_size] for i in range(0, len(numbered), self.batch_size)]
+        if len(batches) == 1:
+            responses = [self._post_batch(batches[0])]
+        else:
+            responses = list(self._get_executor().map(self._post_batch, batches))
+
+        annotations = [[] for _ in segments]
+        for batch, response in zip(batches, responses):
+            for chunk_id, chunk in batch:
+                chunk_annotations = response.get(chunk_id)
+                if chunk_annotations is None or len(chunk_annotations) != len(chunk):
+                    raise SummarizerError(f"Summarizer returned a malformed result for chunk {chunk_id}.")
+                for (segment_index, text), annotation in zip(chunk, chunk_annotations):
+                    annotations[segment_index].append(annotation)
+        return annotations
@@ -0,0 +1,218 @@
+# safeagree_backend/services/summary_cache.py
+# Two-level read-through cache for policy summaries stored in the filebase.
+# Summaries are content-addressed (policy_summary_<hash>.json), so an entry only
+# goes stale when the same key is uploaded again, which invalidates it.
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from services.summary_codec import decode_summary
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryTier:
+    """Thread-safe in-process LRU bounded by entry count, approximate bytes and TTL."""
+    def __init__(self, max_entries=1000, max_bytes=64 * 1024 * 1024, ttl=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, size, expires_at = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, size):
+        if size > self.max_bytes:
+            return # Never let one huge summary flush the whole cache
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def _drop(self, key):
+        value, size, expires_at = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "evictions": self.evictions}
+
+
+class DiskTier:
+    """
+    On-disk cache directory shared by every worker process on the node.
+    Files are written atomically (temp file + rename); TTL and LRU use file mtimes.
+    """
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, ttl=24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._approx_bytes = self._scan_size()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".json")
+
+    def _scan_size(self):
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".json"):
+                total += entry.stat().st_size
+        return total
+
+    def get(self, key):
+        """Returns (stored_bytes, value, json_size) or None."""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                self.invalidate(key)
+                self.evictions += 1
+                return None
+            with open(path, 'rb') as f:
+                raw = f.read()
+            os.utime(path) # Mark as recently used for LRU eviction
+            value, json_bytes = decode_summary(raw)
+            return raw, value, len(json_bytes)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, raw):
+        path = self._path(key)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(raw)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error("Summary disk cache write failed for %s: %s", key, e)
+            return
+        with self._lock:
+            self._approx_bytes += len(raw)
+            over_budget = self._approx_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def invalidate(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Deletes least recently used files until the directory is at 90% of max_bytes."""
+        with self._lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for mtime, size, path in files)
+            for mtime, size, path in sorted(files):
+                if total <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    self.evictions += 1
+                except OSError:
+                    pass
+            self._approx_bytes = total
+
+    def stats(self):
+        return {"bytes": self._approx_bytes, "evictions": self.evictions}
+
+
+class SummaryCache:
+    """
+    Read-through summary cache keyed on result_file_name: an in-process LRU in front
+    of an optional on-disk tier shared between workers. Alongside the decoded summary
+    it keeps the stored (encoded) bytes, so compressed responses can be served without
+    re-encoding. Counts hits per tier, misses and evictions.
+    """
+    def __init__(self, memory_tier, disk_tier=None):
+        self.memory = memory_tier
+        self.disk = disk_tier
+        self._counter_lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "invalidations": 0}
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def get_entry(self, key):
+        """Returns (summary, stored_bytes) for `key`, or None on a miss."""
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._count("memory_hits")
+            return entry
+        if self.disk is not None:
+            cached = self.disk.get(key)
+            if cached is not None:
+                raw, value, json_size = cached
+                self.memory.set(key, (value, raw), json_size + len(raw))
+                self._count("disk_hits")
+                return value, raw
+        self._count("misses")
+        return None
+
+    def get(self, key):
+        """Returns the cached summary for `key`, or None on a miss."""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value, raw, json_size):
+        """
+        Stores a summary in every tier.
+        :param raw: The summary exactly as stored in the filebase.
+        :param json_size: Size of the uncompressed JSON, used for the memory budget.
+        """
+        self.memory.set(key, (value, raw), json_size + len(raw))
+        if self.disk is not None:
+            self.disk.set(key, raw)
+
+    def invalidate(self, key):
+        self.memory.invalidate(key)
+        if self.disk is not None:
+            self.disk.invalidate(key)
+        self._count("invalidations")
+
+    def stats(self):
+        with self._counter_lock:
+            stats = dict(self.counters)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else None
+        stats["memory"] = self.memory.stats()
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
@@ -0,0 +1,73 @@
+# safeagree_backend/services/summary_codec.py
+# On-storage encoding of policy summaries.
+#
+# Format v1 is gzip-compressed JSON. The version marker lives in the gzip header's
+# FNAME field, so a stored object is still a plain gzip stream that can be sent to
+# clients as-is with "Content-Encoding: gzip". Objects written before compression
+# was introduced are bare JSON text and are recognised by the missing gzip magic.
+
+import gzip
+import io
+import json
+
+SUMMARY_FORMAT_VERSION = 1
+FORMAT_LEGACY = 0 # Uncompressed JSON text
+GZIP_MAGIC = b"\x1f\x8b"
+_FNAME_FLAG = 0x08
+_FEXTRA_FLAG = 0x04
+_NAME_PREFIX = "safeagree-summary.v"
+
+
+def encode_summary(summary, compresslevel=6):
+    """
+    Serializes a summary for storage.
+    :return: Tuple (encoded_bytes, json_bytes); json_bytes is the uncompressed form.
+    """
+    json_bytes = json.dumps(summary, separators=(',', ':')).encode('utf-8')
+    buffer = io.BytesIO()
+    # mtime=0 keeps the output deterministic for identical summaries
+    with gzip.GzipFile(filename=f"{_NAME_PREFIX}{SUMMARY_FORMAT_VERSION}.json", mode='wb', fileobj=buffer,
+                       compresslevel=compresslevel, mtime=0) as f:
+        f.write(json_bytes)
+    return buffer.getvalue(), json_bytes
+
+
+def is_compressed(raw):
+    return raw[:2] == GZIP_MAGIC
+
+
+def summary_format_version(raw):
+    """Returns the format version of a stored summary (FORMAT_LEGACY for plain JSON)."""
+    if not is_compressed(raw):
+        return FORMAT_LEGACY
+    flags = raw[3] if len(raw) > 3 else 0
+    if flags & _FNAME_FLAG and not flags & _FEXTRA_FLAG:
+        end = raw.find(b"\x00", 10)
+        name = raw[10:end].decode('latin-1') if end != -1 else ""
+        if name.startswith(_NAME_PREFIX):
+            version = name[len(_NAME_PREFIX):].split('.', 1)[0]
+            if version.isdigit():
+                return int(version)
+    return SUMMARY_FORMAT_VERSION # Gzip written without our name: treat as the current format
+
+
+def decode_summary_bytes(raw):
+    """
+    Returns the uncompressed JSON bytes of a stored summary of any known version.
+    :raises ValueError: If the summary was written in a newer format than this release reads.
+    """
+    version = summary_format_version(raw)
+    if version > SUMMARY_FORMAT_VERSION:
+        raise ValueError(f"Unsupported summary format v{version} (this release reads up to v{SUMMARY_FORMAT_VERSION}).")
+    if version != FORMAT_LEGACY:
+        return gzip.decompress(raw)
+    return raw
+
+
+def decode_summary(raw):
+    """
+    Decodes a stored summary of any known version.
+    :return: Tuple (summary, json_bytes).
+    """
+    json_bytes = decode_summary_bytes(raw)
+    return json.loads(json_bytes.decode('utf-8')), json_bytes
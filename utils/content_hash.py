@@ -0,0 +1,26 @@
+import hashlib
+
+import fnvhash
+
+# 256-bit BLAKE2b: collision-safe at any corpus size, and ~60x the throughput of the
+# pure-Python FNV-1a it replaces (see benchmarks/bench_hashing.py)
+DIGEST_SIZE = 32
+HASH_LENGTH = DIGEST_SIZE * 2 # Hex characters; fits Policy.policy_hash (String(64)) exactly
+
+
+def content_hash(text: str) -> str:
+    """Returns the hex BLAKE2b-256 digest of a policy text (the identity of its content)."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def legacy_content_hash(text: str) -> str:
+    """
+    Returns the FNV-1a 64-bit hash (decimal string) used for policy_hash before
+    BLAKE2b. Only used to recognize rows stored under the old scheme.
+    """
+    return str(fnvhash.fnv1a_64(text.encode('utf-8')))
+
+
+def is_legacy_hash(value) -> bool:
+    """True for hashes stored under the FNV-1a scheme (decimal, at most 20 digits)."""
+    return value is not None and len(str(value)) != HASH_LENGTH
@@ -0,0 +1,21 @@
+import base64
+from datetime import datetime
+
+
+def encode_cursor(processing_date: datetime, row_id: int) -> str:
+    """Encodes a (processing_date, id) keyset position as an opaque URL-safe cursor."""
+    raw = f"{processing_date.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Decodes a cursor produced by encode_cursor.
+    Returns (processing_date, id), or None if the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_part, id_part = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except (ValueError, UnicodeError):
+        return None
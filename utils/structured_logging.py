@@ -0,0 +1,205 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Id of the HTTP request (or the job it queued) the current code runs for
+request_id_var = ContextVar("request_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+# Attributes every LogRecord has; anything else on a record came from `extra=` and is emitted as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "sample_rate", "taskName",
+}
+_exception_formatter = logging.Formatter()
+_state = None # (handler, listener) once configure_logging() has run
+
+
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def valid_request_id(value):
+    """Returns value if it is safe to reuse as a request id (e.g. from X-Request-ID), else None."""
+    return value if value and _REQUEST_ID.match(value) else None
+
+
+def get_request_id():
+    return request_id_var.get()
+
+
+def set_request_id(request_id):
+    """Sets the current request id; returns the token for reset_request_id()."""
+    return request_id_var.set(request_id)
+
+
+def reset_request_id(token):
+    request_id_var.reset(token)
+
+
+def parse_mapping(value, cast=str):
+    """Parses 'a=x,b=y' (e.g. LOG_MODULE_LEVELS) into {'a': cast('x'), 'b': cast('y')}."""
+    mapping = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            key, raw = item.split("=", 1)
+            mapping[key.strip()] = cast(raw.strip())
+    return mapping
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps each record with the current request id ('-' outside requests and jobs)."""
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a share of DEBUG/INFO records of high-volume loggers; warnings and errors
+    always pass. Rates are per logger name prefix (longest match wins), and a single call
+    can set its own with extra={"sample_rate": 0.01}. Kept records carry their rate so
+    consumers can re-weight counts.
+    """
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = sorted((rates or {}).items(), key=lambda item: -len(item[0]))
+        self._rate_of = {} # Logger name -> resolved rate
+
+    def _rate_for(self, name):
+        rate = self._rate_of.get(name)
+        if rate is None:
+            rate = next((r for prefix, r in self.rates if name == prefix or name.startswith(prefix + ".")), 1.0)
+            self._rate_of[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = getattr(record, "sample_rate", None)
+        if rate is None:
+            rate = self._rate_for(record.name)
+        if rate >= 1.0:
+            return True
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without ever blocking the caller: when the
+    bounded queue is full the record is dropped and counted. Only the message and any
+    traceback are rendered in the calling thread; JSON encoding and the write to stdout
+    happen on the listener thread.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage() # Args may be mutated after the call returns
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, request_id, extra fields, exc_info."""
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            entry["request_id"] = request_id
+        sample_rate = getattr(record, "sample_rate", None)
+        if sample_rate is not None:
+            entry["sample_rate"] = sample_rate
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level="INFO", fmt="json", module_levels=None, sample_rates=None, queue_size=10000, stream=None):
+    """
+    Routes all logging through a bounded queue to a background listener that writes
+    JSON (or plain text) lines to stdout. Safe to call more than once; later calls
+    only return the existing handler.
+    :param module_levels: Dict logger name -> level, e.g. {'services.scraper_service': 'WARNING'}.
+    :param sample_rates: Dict logger name prefix -> share of DEBUG/INFO records to keep.
+    :return: The NonBlockingQueueHandler (its `dropped` counts records lost to a full queue).
+    """
+    global _state
+    if _state is not None:
+        return _state[0]
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(SamplingFilter(sample_rates))
+    listener = QueueListener(handler.queue, output)
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    listener.start()
+    atexit.register(listener.stop) # Flushes what is still queued
+    _state = (handler, listener)
+    os.register_at_fork(after_in_child=_restart_after_fork)
+    return handler
+
+
+def _restart_after_fork():
+    """Forked workers (gunicorn --preload, process pools) do not inherit the listener thread: start their own."""
+    global _state
+    if _state is None:
+        return
+    handler, listener = _state
+    handler.queue = queue.Queue(handler.queue.maxsize) # The parent's queue lock may have been held at fork time
+    handler.dropped = 0
+    listener = QueueListener(handler.queue, *listener.handlers)
+    listener.start()
+    atexit.register(listener.stop)
+    _state = (handler, listener)
+
+
+def logging_stats():
+    """Queue depth and dropped-record count of this process's log pipeline."""
+    if _state is None:
+        return {"configured": False}
+    handler = _state[0]
+    return {"configured": True, "queued": handler.queue.qsize(), "max_queue": handler.queue.maxsize,
+            "dropped": handler.dropped}
@@ -0,0 +1,81 @@
+import hashlib
+import io
+import os
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload turns out to be larger than the allowed size while streaming."""
+
+
+class SpooledUpload:
+    """
+    An uploaded file copied out of the request so it outlives it (jobs run after the
+    response is sent). Small uploads stay in memory; larger ones live in a temp file
+    on disk, so only the path crosses into job worker processes.
+    `digest` is the SHA-256 of the raw bytes, computed while the upload streamed in.
+    """
+    def __init__(self, size, digest, data=None, path=None):
+        self.size = size
+        self.digest = digest
+        self.data = data
+        self.path = path
+
+    def open(self):
+        """Returns a binary file object positioned at the start of the upload."""
+        if self.path is not None:
+            return open(self.path, 'rb')
+        return io.BytesIO(self.data)
+
+    def read(self):
+        with self.open() as f:
+            return f.read()
+
+    def cleanup(self):
+        """Deletes the temp file, if any. Safe to call more than once."""
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+def spool_upload(stream, max_bytes, memory_threshold=512 * 1024):
+    """
+    Copies an upload stream in chunks, hashing as it goes. The copy is kept in memory
+    up to memory_threshold bytes and moved to a temp file beyond that.
+    :param stream: Binary file object (e.g. werkzeug FileStorage.stream).
+    :param max_bytes: Largest accepted upload; more raises UploadTooLarge.
+    :return: SpooledUpload.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    buffer = io.BytesIO()
+    spill = None
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit.")
+            digest.update(chunk)
+            if spill is None and size > memory_threshold:
+                spill = tempfile.NamedTemporaryFile(prefix="safeagree-upload-", delete=False)
+                spill.write(buffer.getvalue())
+                buffer = None
+            (spill or buffer).write(chunk)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise
+
+    if spill is not None:
+        spill.close()
+        return SpooledUpload(size, digest.hexdigest(), path=spill.name)
+    return SpooledUpload(size, digest.hexdigest(), data=buffer.getvalue())
@@ -0,0 +1,43 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that never change the policy text behind a URL
+TRACKING_PARAMS = ("utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "gclid", "fbclid")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_policy_url(url: str) -> str:
+    """
+    Returns a canonical form of a policy URL so that trivially different
+    spellings of the same page map to the same key.
+
+    Lower-cases scheme and host, adds a missing scheme, drops default ports,
+    fragments, tracking parameters and trailing slashes, and sorts the query.
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = "https://" + url
+
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def company_name_from_url(url: str) -> str:
+    """Guesses the company name from a URL's domain ('example' for www.example.com)."""
+    domain_parts = (urlsplit(url if "://" in url else "https://" + url).hostname or "").split('.')
+    if len(domain_parts) >= 2:
+        return domain_parts[-2]
+    if domain_parts and domain_parts[0]:
+        return domain_parts[0]
+    return "Unknown Company"